@@ -4,9 +4,13 @@ import firebase_admin
 from firebase_admin import credentials, firestore
 import cloudinary   
 from config import Config 
+from middleware.json_provider import OrjsonProvider
+from middleware.compression import init_compression
  
 app = Flask(__name__)  
 app.config.from_object(Config)
+app.json = OrjsonProvider(app)
+init_compression(app)
 CORS(app) 
 
 # Initialize Firebase   
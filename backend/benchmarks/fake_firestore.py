@@ -0,0 +1,221 @@
+"""In-memory stand-in for the parts of the Firestore client this app uses.
+
+Only meant for benchmarks: no persistence, no security rules, and queries
+are evaluated by scanning the collection.
+"""
+import copy
+import uuid
+from datetime import datetime
+
+class _ChangeType:
+    def __init__(self, name):
+        self.name = name
+
+class _Change:
+    def __init__(self, type_name, document):
+        self.type = _ChangeType(type_name)
+        self.document = document
+
+def _get_path(data, path):
+    for part in path.split('.'):
+        if not isinstance(data, dict) or part not in data:
+            return None
+        data = data[part]
+    return data
+
+def _set_path(data, path, value):
+    parts = path.split('.')
+    for part in parts[:-1]:
+        data = data.setdefault(part, {})
+    data[parts[-1]] = value
+
+class FakeSnapshot:
+    def __init__(self, doc_id, data, reference=None):
+        self.id = doc_id
+        self._data = data
+        self.reference = reference
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field_path):
+        return _get_path(self._data or {}, field_path)
+
+class FakeDocumentReference:
+    def __init__(self, collection, doc_id):
+        self._collection = collection
+        self.id = doc_id
+
+    def get(self, field_paths=None, transaction=None):
+        data = self._collection._docs.get(self.id)
+        if data is not None and field_paths is not None:
+            data = {path: _get_path(data, path) for path in field_paths}
+        return FakeSnapshot(self.id, copy.deepcopy(data) if data is not None else None, self)
+
+    def set(self, data, merge=False):
+        current = self._collection._docs.get(self.id) if merge else None
+        if current is not None:
+            current = copy.deepcopy(current)
+            current.update(copy.deepcopy(data))
+            data = current
+        self._collection._write(self.id, copy.deepcopy(data))
+
+    def update(self, changes):
+        if self.id not in self._collection._docs:
+            raise KeyError(f'No document to update: {self.id}')
+        data = copy.deepcopy(self._collection._docs[self.id])
+        for path, value in changes.items():
+            _set_path(data, path, value)
+        self._collection._write(self.id, data)
+
+    def delete(self):
+        self._collection._delete(self.id)
+
+class FakeQuery:
+    _OPERATORS = {
+        '==': lambda a, b: a == b,
+        '!=': lambda a, b: a != b,
+        '<': lambda a, b: a is not None and a < b,
+        '<=': lambda a, b: a is not None and a <= b,
+        '>': lambda a, b: a is not None and a > b,
+        '>=': lambda a, b: a is not None and a >= b,
+        'in': lambda a, b: a in b,
+        'array_contains': lambda a, b: isinstance(a, list) and b in a,
+    }
+
+    def __init__(self, collection, filters=(), order=(), limit=None, fields=None):
+        self._collection = collection
+        self._filters = tuple(filters)
+        self._order = tuple(order)
+        self._limit = limit
+        self._fields = fields
+
+    def _copy(self, **changes):
+        state = {
+            'filters': self._filters, 'order': self._order,
+            'limit': self._limit, 'fields': self._fields
+        }
+        state.update(changes)
+        return FakeQuery(self._collection, **state)
+
+    def where(self, field, op, value):
+        return self._copy(filters=self._filters + ((field, op, value),))
+
+    def order_by(self, field, direction='ASCENDING'):
+        return self._copy(order=self._order + ((field, direction),))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def select(self, field_paths):
+        return self._copy(fields=list(field_paths))
+
+    def _matches(self, data):
+        return all(self._OPERATORS[op](_get_path(data, field), value) for field, op, value in self._filters)
+
+    def stream(self):
+        docs = sorted(self._collection._docs.items())
+        matching = [(doc_id, data) for doc_id, data in docs if self._matches(data)]
+        for field, direction in reversed(self._order):
+            matching.sort(key=lambda item: _get_path(item[1], field), reverse=direction == 'DESCENDING')
+        if self._limit is not None:
+            matching = matching[:self._limit]
+        for doc_id, data in matching:
+            if self._fields is not None:
+                data = {path: _get_path(data, path) for path in self._fields}
+            yield FakeSnapshot(doc_id, copy.deepcopy(data), self._collection.document(doc_id))
+
+    def get(self):
+        return list(self.stream())
+
+    def on_snapshot(self, callback):
+        """Listen to documents matching the filters; order and limit are ignored"""
+        watch = _Watch(self._collection, self, callback)
+        self._collection._watches.append(watch)
+        changes = [_Change('ADDED', FakeSnapshot(doc_id, copy.deepcopy(data)))
+                   for doc_id, data in sorted(self._collection._docs.items()) if self._matches(data)]
+        callback(None, changes, datetime.utcnow())
+        return watch
+
+class _Watch:
+    def __init__(self, collection, query, callback):
+        self._collection = collection
+        self.query = query
+        self.callback = callback
+
+    def unsubscribe(self):
+        self._collection._watches.remove(self)
+
+class FakeCollection(FakeQuery):
+    def __init__(self, name):
+        self.name = name
+        self._docs = {}
+        self._watches = []
+        super().__init__(self)
+
+    def document(self, doc_id=None):
+        return FakeDocumentReference(self, doc_id or uuid.uuid4().hex[:20])
+
+    def add(self, data):
+        ref = self.document()
+        ref.set(data)
+        return datetime.utcnow(), ref
+
+    def _notify(self, type_name, doc_id, data):
+        for watch in list(self._watches):
+            if watch.query._matches(data):
+                watch.callback(None, [_Change(type_name, FakeSnapshot(doc_id, copy.deepcopy(data)))], datetime.utcnow())
+
+    def _write(self, doc_id, data):
+        type_name = 'MODIFIED' if doc_id in self._docs else 'ADDED'
+        self._docs[doc_id] = data
+        self._notify(type_name, doc_id, data)
+
+    def _delete(self, doc_id):
+        data = self._docs.pop(doc_id, None)
+        if data is not None:
+            self._notify('REMOVED', doc_id, data)
+
+    def load(self, documents):
+        """Bulk-insert {doc_id: data} without notifying listeners"""
+        self._docs.update(documents)
+
+class FakeWriteBatch:
+    def __init__(self):
+        self._ops = []
+
+    def set(self, ref, data, merge=False):
+        self._ops.append(lambda: ref.set(data, merge=merge))
+
+    def update(self, ref, changes):
+        self._ops.append(lambda: ref.update(changes))
+
+    def delete(self, ref):
+        self._ops.append(ref.delete)
+
+    def commit(self):
+        for op in self._ops:
+            op()
+        self._ops = []
+
+class FakeFirestore:
+    """Drop-in for firestore.client() covering collection, batch and get_all"""
+
+    def __init__(self):
+        self._collections = {}
+
+    def collection(self, name):
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(name)
+        return self._collections[name]
+
+    def batch(self):
+        return FakeWriteBatch()
+
+    def get_all(self, references, field_paths=None):
+        for ref in references:
+            yield ref.get(field_paths=field_paths)
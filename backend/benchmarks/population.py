@@ -0,0 +1,95 @@
+"""Synthetic user populations shaped like the documents create_profile writes."""
+import random
+from datetime import datetime, timedelta
+from services.geo_service import location_for
+from services.profile_features import ProfileFeatures
+
+TECH_STACK = [
+    'Python', 'JavaScript', 'TypeScript', 'React', 'Angular', 'Vue', 'Node.js',
+    'Django', 'Flask', 'FastAPI', 'Java', 'Spring', 'Kotlin', 'Swift', 'Go',
+    'Rust', 'C++', 'C#', '.NET', 'PHP', 'Laravel', 'Ruby', 'Rails', 'Flutter',
+    'React Native', 'AWS', 'GCP', 'Azure', 'Docker', 'Kubernetes', 'Terraform',
+    'PostgreSQL', 'MySQL', 'MongoDB', 'Redis', 'Kafka', 'Spark', 'TensorFlow',
+    'PyTorch', 'Pandas', 'GraphQL', 'Elixir', 'Scala', 'Hadoop', 'Firebase'
+]
+ROLES = [
+    'Backend Developer', 'Frontend Developer', 'Full Stack Developer',
+    'Mobile Developer', 'DevOps Engineer', 'Data Scientist', 'ML Engineer',
+    'QA Engineer', 'Engineering Manager', 'Site Reliability Engineer'
+]
+RELIGIONS = ['Hindu', 'Christian', 'Muslim', 'Jain', 'Sikh', 'Buddhist', 'Other']
+RELIGION_WEIGHTS = [70, 10, 10, 3, 3, 2, 2]
+WORK_TYPES = ['remote', 'hybrid', 'office']
+CITIES = [
+    ('Chennai', 'Tamil Nadu', 14), ('Coimbatore', 'Tamil Nadu', 5), ('Madurai', 'Tamil Nadu', 3),
+    ('Tiruchirappalli', 'Tamil Nadu', 2), ('Salem', 'Tamil Nadu', 1), ('Bengaluru', 'Karnataka', 16),
+    ('Mysuru', 'Karnataka', 1), ('Hyderabad', 'Telangana', 12), ('Pune', 'Maharashtra', 9),
+    ('Mumbai', 'Maharashtra', 8), ('Kochi', 'Kerala', 3), ('Thiruvananthapuram', 'Kerala', 2),
+    ('Delhi', 'Delhi', 6), ('Gurugram', 'Haryana', 5), ('Noida', 'Uttar Pradesh', 4),
+    ('Ahmedabad', 'Gujarat', 3), ('Kolkata', 'West Bengal', 3), ('Jaipur', 'Rajasthan', 1),
+    ('Chandigarh', 'Chandigarh', 1), ('Indore', 'Madhya Pradesh', 1)
+]
+
+def generate_profile(rng, user_id, now):
+    """One users/{id} document, including the derived features map"""
+    city, state, _ = rng.choices(CITIES, weights=[c[2] for c in CITIES])[0]
+    dob = now - timedelta(days=rng.randint(21 * 365, 40 * 365))
+    min_age = rng.randint(21, 30)
+    profile = {
+        'userId': user_id,
+        'fullName': f'User {user_id}',
+        'dateOfBirth': dob.strftime('%Y-%m-%d'),
+        'gender': rng.choice(['Male', 'Female']),
+        'religion': rng.choices(RELIGIONS, weights=RELIGION_WEIGHTS)[0],
+        'community': None,
+        'nativeLanguage': rng.choice(['Tamil', 'English', 'Telugu', 'Kannada', 'Malayalam', 'Hindi']),
+        'city': city,
+        'state': state,
+        'country': 'India',
+        'location': location_for(city),
+        'developerInfo': {
+            'role': rng.choice(ROLES),
+            'yearsOfExperience': rng.randint(0, 15),
+            'techStack': rng.sample(TECH_STACK, rng.randint(2, 8)),
+            'workType': rng.choice(WORK_TYPES),
+            'companyName': None,
+            'githubUrl': None,
+            'linkedinUrl': None,
+            'portfolioUrl': None
+        },
+        'preferences': {
+            'ageRange': {'min': min_age, 'max': min_age + rng.randint(3, 12)},
+            'religions': rng.choice([[], [], ['Hindu'], ['Christian'], ['Muslim'], ['Hindu', 'Jain']]),
+            'communities': [],
+            'techPreferences': [],
+            'workPreference': rng.choice([None, None, 'remote', 'hybrid', 'office']),
+            'locationRadius': rng.choice([25, 50, 50, 100, 500])
+        },
+        'privacy': {'hideContact': True, 'hideLocation': False, 'hidePhotos': False},
+        'verification': {
+            'emailVerified': False,
+            'phoneVerified': False,
+            'profileVerified': rng.random() < 0.4,
+            'photoVerified': False
+        },
+        'createdAt': now,
+        'updatedAt': now,
+        'isActive': rng.random() < 0.95,
+        'isPremium': rng.random() < 0.1
+    }
+    profile['features'] = ProfileFeatures.from_profile(profile).to_document()
+    return profile
+
+def generate_population(size, seed=42):
+    """{userId: profile} for `size` synthetic users, reproducible per seed"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    width = len(str(size))
+    return {
+        f'user{i:0{width}d}': generate_profile(rng, f'user{i:0{width}d}', now)
+        for i in range(size)
+    }
+
+def seed_vocabulary(db):
+    """Pre-register every generated technology so no transactions are needed"""
+    db.collection('meta').document('techVocabulary').set({'terms': list(TECH_STACK)})
@@ -0,0 +1,194 @@
+"""Benchmark the discover hot path against an in-memory Firestore.
+
+Run from backend/:
+
+    python -m benchmarks.run_matching                          # 10k, 100k, 1M
+    python -m benchmarks.run_matching --sizes 10000 --requests 500
+    python -m benchmarks.run_matching --sizes 10000 --save-baseline
+    python -m benchmarks.run_matching --sizes 10000 --check    # exit 1 on regression
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+import types
+
+from benchmarks.fake_firestore import FakeFirestore
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baselines.json')
+DEFAULT_SIZES = [10000, 100000, 1000000]
+
+# Metrics where a larger value is better; every other metric is a cost
+HIGHER_IS_BETTER = {'scalarPairsPerSec', 'candidatesScoredPerSec'}
+
+def install_fake_db():
+    """Make `from app import db` resolve to an in-memory client"""
+    db = FakeFirestore()
+    app_module = types.ModuleType('app')
+    app_module.db = db
+    sys.modules['app'] = app_module
+    return db
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+def reset_services():
+    """Drop process-wide singletons so the next population starts cold"""
+    from services import candidate_index, matching_service, seen_pairs
+    if candidate_index._index is not None:
+        candidate_index._index.stop()
+    candidate_index._index = None
+    if seen_pairs._seen_pairs is not None:
+        seen_pairs._seen_pairs.stop()
+    seen_pairs._seen_pairs = None
+    matching_service._ranking_cache = matching_service.ResultCache(
+        matching_service.Config.DISCOVER_CACHE_MAX_BYTES,
+        matching_service.Config.DISCOVER_CACHE_TTL
+    )
+
+def run_size(db, size, requests, limit, seed, trace_memory):
+    from benchmarks.population import generate_population, seed_vocabulary
+    from services import matching_service
+    from services.batch_scoring import prune_stats
+    from services.candidate_index import get_candidate_index
+
+    db._collections.clear()
+    reset_services()
+    seed_vocabulary(db)
+
+    started = time.perf_counter()
+    population = generate_population(size, seed)
+    db.collection('users').load(population)
+    generate_s = time.perf_counter() - started
+
+    if trace_memory:
+        tracemalloc.start()
+
+    # Initial snapshot plus the columnar build for both genders
+    started = time.perf_counter()
+    index = get_candidate_index()
+    index.wait_ready()
+    pools = {gender: len(index.active_columns(gender)) for gender in ('Male', 'Female')}
+    index_load_s = time.perf_counter() - started
+
+    rng = random.Random(seed)
+    user_ids = rng.sample(sorted(population), min(requests, size))
+
+    # Scalar reference scorer, for comparison with the batch path
+    pairs = [(population[a], population[b]) for a, b in zip(user_ids, reversed(user_ids))] * 20
+    started = time.perf_counter()
+    for user_profile, candidate_profile in pairs:
+        matching_service.calculate_match_score(user_profile, candidate_profile)
+    scalar_s = time.perf_counter() - started
+
+    prune_stats.reset()
+    latencies = []
+    scored = 0
+    for user_id in user_ids:
+        opposite = 'Female' if population[user_id]['gender'] == 'Male' else 'Male'
+        started = time.perf_counter()
+        matching_service.find_matches(user_id, limit)
+        latencies.append(time.perf_counter() - started)
+        scored += pools[opposite]
+
+    # First pages through the cursor path (full ranking, cache cold per user)
+    page_latencies = []
+    for user_id in user_ids:
+        started = time.perf_counter()
+        matching_service.find_match_page(user_id, limit)
+        page_latencies.append(time.perf_counter() - started)
+
+    result = {
+        'users': size,
+        'requests': len(user_ids),
+        'generateSeconds': round(generate_s, 3),
+        'indexLoadSeconds': round(index_load_s, 3),
+        'scalarPairsPerSec': round(len(pairs) / scalar_s),
+        'findMatchesP50Ms': round(percentile(latencies, 50) * 1000, 3),
+        'findMatchesP95Ms': round(percentile(latencies, 95) * 1000, 3),
+        'findMatchesP99Ms': round(percentile(latencies, 99) * 1000, 3),
+        'findMatchesMeanMs': round(statistics.mean(latencies) * 1000, 3),
+        'firstPageP50Ms': round(percentile(page_latencies, 50) * 1000, 3),
+        'firstPageP99Ms': round(percentile(page_latencies, 99) * 1000, 3),
+        'candidatesScoredPerSec': round(scored / sum(latencies)),
+        'pruneRate': round(prune_stats.snapshot()['pruneRate'], 4),
+        'peakRssMb': round(peak_rss_mb(), 1)
+    }
+    if trace_memory:
+        result['tracedPeakMb'] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 1)
+        tracemalloc.stop()
+    return result
+
+def compare(results, baselines, tolerance):
+    """Print deltas against stored baselines; return the regressed metrics"""
+    regressions = []
+    for result in results:
+        baseline = baselines.get(str(result['users']))
+        if not baseline:
+            print(f"  no baseline for {result['users']} users")
+            continue
+        for metric, value in result.items():
+            base = baseline.get(metric)
+            if metric in ('users', 'requests', 'generateSeconds', 'pruneRate') or not base:
+                continue
+            change = (value - base) / base
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            flag = '  REGRESSION' if worse > tolerance else ''
+            print(f"  {result['users']:>8} {metric:<24} {base:>12} -> {value:>12} ({change:+.1%}){flag}")
+            if flag:
+                regressions.append((result['users'], metric))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES),
+                        help='comma-separated population sizes')
+    parser.add_argument('--requests', type=int, default=200, help='discover requests per size')
+    parser.add_argument('--limit', type=int, default=20, help='matches per request')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='also report tracemalloc peak (slow on large populations)')
+    parser.add_argument('--save-baseline', action='store_true', help=f'write results to {BASELINE_PATH}')
+    parser.add_argument('--check', action='store_true', help='exit 1 if any metric regressed')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression')
+    args = parser.parse_args(argv)
+
+    db = install_fake_db()
+    results = []
+    for size in (int(s) for s in args.sizes.split(',') if s):
+        print(f"Benchmarking {size} users...", flush=True)
+        result = run_size(db, size, args.requests, args.limit, args.seed, args.trace_memory)
+        print(json.dumps(result, indent=2), flush=True)
+        results.append(result)
+
+    baselines = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baselines = json.load(f)
+
+    print('Against baseline:')
+    regressions = compare(results, baselines, args.tolerance)
+
+    if args.save_baseline:
+        baselines.update({str(result['users']): result for result in results})
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f'Saved baseline to {BASELINE_PATH}')
+
+    if args.check and regressions:
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
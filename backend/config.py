@@ -19,4 +19,47 @@ class Config:
     
     # App Config
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
-    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'mp4', 'webm'} 
+    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'mp4', 'webm'}
+    GZIP_MIN_BYTES = int(os.getenv('GZIP_MIN_BYTES', 1024))  # smaller JSON responses are sent uncompressed
+    GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', 6))
+    
+    # Auth
+    AUTH_TOKEN_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_SIZE', 10000))  # verified ID tokens kept until they expire
+    AUTH_ADMIN_TOKEN_TTL = int(os.getenv('AUTH_ADMIN_TOKEN_TTL', 60))  # seconds an admin token is trusted before its revocation is rechecked
+    
+    # Chat
+    CHAT_READ_MARK_WINDOW = float(os.getenv('CHAT_READ_MARK_WINDOW', 5))  # seconds between read-mark writes per user and conversation
+    CHAT_STREAM_KEEPALIVE = float(os.getenv('CHAT_STREAM_KEEPALIVE', 15))  # seconds between keep-alives on an idle event stream
+    CHAT_STREAM_MAX_PENDING = int(os.getenv('CHAT_STREAM_MAX_PENDING', 100))  # undelivered events before a slow stream is dropped
+    CHAT_STREAM_MAX_SECONDS = int(os.getenv('CHAT_STREAM_MAX_SECONDS', 300))  # streams are closed and reopened at least this often
+    
+    # Notifications
+    NOTIFICATION_QUEUE_SIZE = int(os.getenv('NOTIFICATION_QUEUE_SIZE', 10000))  # queued before enqueue writes inline
+    NOTIFICATION_BATCH_SIZE = int(os.getenv('NOTIFICATION_BATCH_SIZE', 500))  # notifications per WriteBatch, at most 500
+    NOTIFICATION_FLUSH_INTERVAL = float(os.getenv('NOTIFICATION_FLUSH_INTERVAL', 0.2))  # seconds a batch waits to fill
+    NOTIFICATION_MAX_ATTEMPTS = int(os.getenv('NOTIFICATION_MAX_ATTEMPTS', 5))
+    NOTIFICATION_RETRY_BACKOFF = float(os.getenv('NOTIFICATION_RETRY_BACKOFF', 0.5))  # seconds before the first retry, doubled after each
+    BROADCAST_PAGE_SIZE = int(os.getenv('BROADCAST_PAGE_SIZE', 500))  # recipients per broadcast checkpoint
+    BROADCAST_LEASE_SECONDS = int(os.getenv('BROADCAST_LEASE_SECONDS', 120))  # a job not checkpointed for this long may be resumed
+    FCM_SEND_WORKERS = int(os.getenv('FCM_SEND_WORKERS', 4))  # concurrent 500-token multicasts
+    
+    # Matching
+    CANDIDATE_INDEX_TIMEOUT = float(os.getenv('CANDIDATE_INDEX_TIMEOUT', 2))  # seconds to wait for the first snapshot
+    MATCH_FEED_SIZE = int(os.getenv('MATCH_FEED_SIZE', 100))
+    MATCH_FEED_TTL = int(os.getenv('MATCH_FEED_TTL', 3600))  # seconds before a feed is rebuilt
+    DISCOVER_CACHE_TTL = int(os.getenv('DISCOVER_CACHE_TTL', 300))  # seconds a ranked result set is reused for paging
+    DISCOVER_CACHE_MAX_BYTES = int(os.getenv('DISCOVER_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    SEEN_PAIRS_MODE = os.getenv('SEEN_PAIRS_MODE', 'exact')  # exact or bloom
+    SEEN_PAIRS_FALSE_POSITIVE_RATE = float(os.getenv('SEEN_PAIRS_FALSE_POSITIVE_RATE', 0.001))
+    SEEN_PAIRS_MAX_USERS = int(os.getenv('SEEN_PAIRS_MAX_USERS', 50000))
+    SEEN_PAIRS_TTL = int(os.getenv('SEEN_PAIRS_TTL', 600))  # seconds before a user's seen set is re-read
+    TECH_STACK_MAX_TERMS = int(os.getenv('TECH_STACK_MAX_TERMS', 30))  # technologies a profile may list
+    TECH_TERM_MAX_LENGTH = int(os.getenv('TECH_TERM_MAX_LENGTH', 40))  # characters per technology name
+    TECH_VOCABULARY_MAX_TERMS = int(os.getenv('TECH_VOCABULARY_MAX_TERMS', 4096))  # technologies given a mask bit; later ones are not matched
+    
+    # Admin statistics
+    STATS_COUNTER_SHARDS = int(os.getenv('STATS_COUNTER_SHARDS', 10))  # shards per dashboard counter
+    
+    # Profile cache
+    PROFILE_CACHE_SIZE = int(os.getenv('PROFILE_CACHE_SIZE', 10000))  # profiles kept in memory per process
+    PROFILE_CACHE_TTL = int(os.getenv('PROFILE_CACHE_TTL', 300))  # seconds before a cached profile is re-read
@@ -0,0 +1,15 @@
+"""Gunicorn settings, read automatically when gunicorn starts in backend/:
+
+    gunicorn app:app
+
+Chat event streams (/api/chat/stream) stay open for minutes, so workers
+are threaded; under the default sync worker a single open chat tab would
+tie up a whole worker.
+"""
+import os
+
+bind = os.getenv('GUNICORN_BIND', f"0.0.0.0:{os.getenv('PORT', '5000')}")
+workers = int(os.getenv('GUNICORN_WORKERS', 2))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 100))  # open streams plus ordinary requests per worker
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
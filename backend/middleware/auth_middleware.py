@@ -1,6 +1,6 @@
 from functools import wraps
 from flask import request, jsonify
-from firebase_admin import auth
+from middleware.token_cache import verify_token
 
 def require_auth(f):
     @wraps(f)
@@ -15,10 +15,11 @@ def require_auth(f):
             if token.startswith('Bearer '):
                 token = token.split('Bearer ')[1]
             
-            # Verify the token
-            decoded_token = auth.verify_id_token(token)
+            # Verify the token (signature checked once per token, then cached)
+            decoded_token = verify_token(token)
             request.user_id = decoded_token['uid']
             request.user_email = decoded_token.get('email')
+            request.claims = decoded_token
             
         except Exception as e:
             return jsonify({"error": "Invalid token", "details": str(e)}), 401
@@ -39,14 +40,20 @@ def require_admin(f):
             if token.startswith('Bearer '):
                 token = token.split('Bearer ')[1]
             
-            decoded_token = auth.verify_id_token(token)
+            decoded_token = verify_token(token)
             request.user_id = decoded_token['uid']
+            request.claims = decoded_token
             
-            # Check if user is admin
-            from app import db
-            user_doc = db.collection('users').document(request.user_id).get()
+            # Check if user is admin: a true admin claim is enough; anything
+            # else falls back to the profile, where admins are bootstrapped
+            if decoded_token.get('admin'):
+                is_admin = True
+            else:
+                from services.profile_cache import get_profile_cache
+                user_data = get_profile_cache().get(request.user_id)
+                is_admin = user_data is not None and user_data.get('isAdmin', False)
             
-            if not user_doc.exists or not user_doc.to_dict().get('isAdmin', False):
+            if not is_admin:
                 return jsonify({"error": "Admin access required"}), 403
             
         except Exception as e:
@@ -54,4 +61,4 @@ def require_admin(f):
         
         return f(*args, **kwargs)
     
-    return decorated_function 
+    return decorated_function
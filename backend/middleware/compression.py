@@ -0,0 +1,31 @@
+import gzip
+from flask import request
+
+def init_compression(app):
+    """Gzip JSON responses above GZIP_MIN_BYTES for clients that accept it"""
+    min_bytes = app.config['GZIP_MIN_BYTES']
+    level = app.config['GZIP_LEVEL']
+
+    @app.after_request
+    def compress_response(response):
+        response.vary.add('Accept-Encoding')
+        if (
+            response.status_code < 200
+            or response.status_code >= 300
+            or response.direct_passthrough
+            or response.is_streamed
+            or response.mimetype != 'application/json'
+            or 'Content-Encoding' in response.headers
+            or request.accept_encodings['gzip'] <= 0
+        ):
+            return response
+
+        data = response.get_data()
+        if len(data) < min_bytes:
+            return response
+
+        response.set_data(gzip.compress(data, compresslevel=level))
+        response.headers['Content-Encoding'] = 'gzip'
+        return response
+
+    return app
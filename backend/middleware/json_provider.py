@@ -0,0 +1,42 @@
+import base64
+from datetime import date, datetime
+import orjson
+from flask.json.provider import JSONProvider
+
+# Naive datetimes in this app are UTC (datetime.utcnow()), so say so in the output
+ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+def _default(value):
+    """Types orjson does not serialize by itself"""
+    # Firestore timestamps come back as DatetimeWithNanoseconds, a datetime subclass
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(bytes(value)).decode('ascii')
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+def dumps_bytes(obj):
+    """UTF-8 JSON for obj, with the same handling as API responses"""
+    return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS)
+
+class OrjsonProvider(JSONProvider):
+    """JSON provider backed by orjson
+
+    Datetimes, including Firestore timestamps, are written as ISO 8601;
+    sets as lists; bytes as base64 strings.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            dumps_bytes(obj),
+            mimetype='application/json'
+        )
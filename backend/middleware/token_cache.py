@@ -0,0 +1,76 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from firebase_admin import auth
+from config import Config
+
+# Stop trusting a cached token slightly before it expires, so a request
+# never runs on a token Firebase would already reject
+EXPIRY_MARGIN_SECONDS = 5
+
+class VerifiedTokenCache:
+    """Decoded ID tokens keyed by a digest of the raw token, kept until `exp`
+
+    Only successful verifications are cached. The raw token is never stored.
+    Tokens carrying the admin claim are also checked for revocation, and
+    kept for at most admin_ttl seconds, so revoking admin access reaches
+    every process within that time.
+    """
+
+    def __init__(self, max_entries=None, admin_ttl=None):
+        self.max_entries = max_entries or Config.AUTH_TOKEN_CACHE_SIZE
+        self.admin_ttl = admin_ttl or Config.AUTH_ADMIN_TOKEN_TTL
+        self._entries = OrderedDict()  # digest -> (expires_at, decoded_token)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _digest(token):
+        return hashlib.sha256(token.encode('utf-8')).digest()
+
+    def verify(self, token):
+        """Return the decoded token, verifying its signature only on a miss"""
+        key = self._digest(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+            self.misses += 1
+
+        decoded_token = auth.verify_id_token(token)
+        expires_at = decoded_token.get('exp', 0) - EXPIRY_MARGIN_SECONDS
+        if decoded_token.get('admin'):
+            decoded_token = auth.verify_id_token(token, check_revoked=True)
+            expires_at = min(expires_at, now + self.admin_ttl)
+        if expires_at > now:
+            with self._lock:
+                self._entries[key] = (expires_at, decoded_token)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return decoded_token
+
+    def evict_user(self, user_id):
+        """Forget every cached token of a user, e.g. after revoking access"""
+        with self._lock:
+            stale = [key for key, (_, decoded_token) in self._entries.items()
+                     if decoded_token.get('uid') == user_id]
+            for key in stale:
+                del self._entries[key]
+
+    def snapshot(self):
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+token_cache = VerifiedTokenCache()
+
+def verify_token(token):
+    """Verify a Firebase ID token through the process-wide cache"""
+    return token_cache.verify(token)
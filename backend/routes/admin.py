@@ -1,80 +1,103 @@
 from flask import Blueprint, request, jsonify
 from middleware.auth_middleware import require_admin
+from middleware.token_cache import token_cache
+from services.feed_service import get_feed_builder
+from services.batch_scoring import prune_stats
+from services.user_loader import get_user_loader
+from services.profile_cache import get_profile_cache
+from services.claims_service import update_claims
+from services.notification_outbox import get_notification_outbox
+from services.broadcast_jobs import BROADCAST_FILTERS, get_broadcast_runner, job_status
+from services.stats_service import count_query, increment, read_counters
+from services.pagination import decode_page_cursor, encode_page_cursor, parse_fields
+from firebase_admin import auth, firestore
 from app import db
 from datetime import datetime, timedelta
 
 bp = Blueprint('admin', __name__, url_prefix='/api/admin')
 
+MAX_USERS_PAGE = 100
+
+# Columns the admin user listing may project to
+USER_LIST_FIELDS = {
+    'fullName', 'email', 'phone', 'photos', 'gender', 'city', 'state',
+    'verification', 'isPremium', 'isActive', 'isAdmin', 'isFeatured', 'createdAt'
+}
+
 @bp.route('/dashboard', methods=['GET'])
 @require_admin
 def get_dashboard_stats():
     """Get admin dashboard statistics"""
     try:
-        # Total users
-        total_users = len(list(db.collection('users').stream()))
+        # Maintained counters: every shard in one batched read
+        counters = read_counters(db)
         
-        # Active users (logged in last 30 days)
+        # Time-windowed stats can't be kept incrementally; count them server-side
         thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        active_users = db.collection('users')\
-            .where('lastLoginAt', '>=', thirty_days_ago)\
-            .stream()
-        active_count = len(list(active_users))
-        
-        # Pending verifications
-        pending_verifications = db.collection('users')\
-            .where('verification.profileVerified', '==', False)\
-            .stream()
-        pending_count = len(list(pending_verifications))
-        
-        # Total matches
-        total_matches = len(list(db.collection('matches').stream()))
-        
-        # Active conversations
-        active_conversations = db.collection('conversations')\
-            .where('lastMessageAt', '>=', thirty_days_ago)\
-            .stream()
-        active_conv_count = len(list(active_conversations))
-        
-        # Pending reports
-        pending_reports = db.collection('reports')\
-            .where('status', '==', 'pending')\
-            .stream()
-        pending_reports_count = len(list(pending_reports))
-        
-        # Premium users
-        premium_users = db.collection('users')\
-            .where('isPremium', '==', True)\
-            .stream()
-        premium_count = len(list(premium_users))
+        active_count = count_query(
+            db.collection('users').where('lastLoginAt', '>=', thirty_days_ago)
+        )
+        active_conv_count = count_query(
+            db.collection('conversations').where('lastMessageAt', '>=', thirty_days_ago)
+        )
+        
+        # Reports are filed outside this API, so they are counted too
+        pending_reports_count = count_query(
+            db.collection('reports').where('status', '==', 'pending')
+        )
         
         return jsonify({
             "success": True,
             "stats": {
-                "totalUsers": total_users,
+                "totalUsers": counters['totalUsers'],
                 "activeUsers": active_count,
-                "pendingVerifications": pending_count,
-                "totalMatches": total_matches,
+                "pendingVerifications": counters['pendingVerifications'],
+                "totalMatches": counters['totalMatches'],
                 "activeConversations": active_conv_count,
                 "pendingReports": pending_reports_count,
-                "premiumUsers": premium_count
+                "premiumUsers": counters['premiumUsers']
             }
         })
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@bp.route('/matching-stats', methods=['GET'])
+@require_admin
+def get_matching_stats():
+    """Get candidate pruning counters from the matching engine"""
+    return jsonify({"success": True, "pruning": prune_stats.snapshot()})
+
+@bp.route('/cache-stats', methods=['GET'])
+@require_admin
+def get_cache_stats():
+    """Get hit/miss/eviction counters from the profile and token caches,
+    and delivery counters from the notification outbox"""
+    return jsonify({
+        "success": True,
+        "profiles": get_profile_cache().snapshot(),
+        "tokens": token_cache.snapshot(),
+        "notifications": get_notification_outbox().snapshot()
+    })
+
 @bp.route('/users', methods=['GET'])
 @require_admin
 def get_all_users():
-    """Get all users with filters"""
+    """Get users with filters, newest first, one keyset page at a time"""
     try:
-        page = request.args.get('page', 1, type=int)
-        limit = request.args.get('limit', 20, type=int)
+        limit = max(1, min(request.args.get('limit', 20, type=int), MAX_USERS_PAGE))
         filter_type = request.args.get('filter', 'all')
         
+        try:
+            fields = parse_fields(request.args.get('fields'), USER_LIST_FIELDS)
+            cursor = request.args.get('cursor')
+            after = decode_page_cursor(cursor) if cursor else None
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
         query = db.collection('users')
         
-        # Apply filters
+        # Apply filters (each combination has a composite index in firestore.indexes.json)
         if filter_type == 'verified':
             query = query.where('verification.profileVerified', '==', True)
         elif filter_type == 'unverified':
@@ -82,6 +105,21 @@ def get_all_users():
         elif filter_type == 'premium':
             query = query.where('isPremium', '==', True)
         
+        # Stable order: creation time, ties broken by document ID
+        query = query.order_by('createdAt', direction='DESCENDING')\
+            .order_by(firestore.FieldPath.document_id(), direction='DESCENDING')
+        
+        if fields is not None:
+            # createdAt is needed to build the next cursor
+            query = query.select(sorted(set(fields) | {'createdAt'}))
+        
+        if after is not None:
+            created_at, last_id = after
+            query = query.start_after({
+                'createdAt': created_at,
+                '__name__': db.collection('users').document(last_id)
+            })
+        
         # Get users
         users = query.limit(limit).stream()
         
@@ -91,11 +129,16 @@ def get_all_users():
             user_data['id'] = user.id
             result.append(user_data)
         
+        next_cursor = None
+        if len(result) == limit:
+            last = result[-1]
+            next_cursor = encode_page_cursor(last.get('createdAt'), last['id'])
+        
         return jsonify({
             "success": True,
             "users": result,
-            "page": page,
-            "limit": limit
+            "limit": limit,
+            "nextCursor": next_cursor
         })
         
     except Exception as e:
@@ -127,23 +170,63 @@ def verify_user(user_id):
         update_data['verifiedAt'] = datetime.utcnow()
         update_data['verifiedBy'] = request.user_id
         
-        user_ref.update(update_data)
+        batch = db.batch()
+        batch.update(user_ref, update_data)
+        if verification_type == 'profile' and \
+                not (user_doc.to_dict().get('verification') or {}).get('profileVerified'):
+            increment(db, 'pendingVerifications', -1, batch)
+        batch.commit()
+        get_profile_cache().invalidate(user_id)
+        if verification_type == 'profile':
+            update_claims(user_id, verified=True)
         
         # Send notification to user
-        db.collection('notifications').add({
-            'userId': user_id,
-            'type': 'verification_approved',
-            'title': 'Profile Verified',
-            'message': f'Your {verification_type} has been verified!',
-            'read': False,
-            'createdAt': datetime.utcnow()
-        })
+        get_notification_outbox().enqueue(
+            user_id, 'verification_approved', 'Profile Verified',
+            f'Your {verification_type} has been verified!'
+        )
         
         return jsonify({"success": True, "message": "User verified successfully"})
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@bp.route('/users/<user_id>/admin', methods=['POST'])
+@require_admin
+def set_admin(user_id):
+    """Grant or revoke admin access; only super admins may do this"""
+    try:
+        if not request.claims.get('superAdmin'):
+            return jsonify({"error": "Super admin access required"}), 403
+        
+        data = request.json or {}
+        is_admin = bool(data.get('isAdmin', True))
+        
+        user_ref = db.collection('users').document(user_id)
+        if not user_ref.get().exists:
+            return jsonify({"error": "User not found"}), 404
+        
+        user_ref.update({
+            'isAdmin': is_admin,
+            'adminUpdatedAt': datetime.utcnow(),
+            'adminUpdatedBy': request.user_id
+        })
+        get_profile_cache().invalidate(user_id)
+        
+        # A grant takes effect on the user's next token refresh. A revocation
+        # also ends their sessions: tokens already issued still carry the
+        # claim, so they are revoked and dropped from this process's cache
+        # (other processes recheck admin tokens every AUTH_ADMIN_TOKEN_TTL).
+        update_claims(user_id, admin=is_admin)
+        if not is_admin:
+            auth.revoke_refresh_tokens(user_id)
+            token_cache.evict_user(user_id)
+        
+        return jsonify({"success": True, "isAdmin": is_admin})
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @bp.route('/reports', methods=['GET'])
 @require_admin
 def get_reports():
@@ -160,24 +243,27 @@ def get_reports():
         for report in reports:
             report_data = report.to_dict()
             report_data['id'] = report.id
+            result.append(report_data)
+
+        # Get reporter and reported user info in one batch
+        user_ids = [r.get('reporterId') for r in result] + [r.get('reportedId') for r in result]
+        users = get_user_loader().load_many(user_ids, fields=['fullName'])
+
+        for report_data in result:
+            reporter = users.get(report_data.get('reporterId'))
+            reported = users.get(report_data.get('reportedId'))
             
-            # Get reporter and reported user info
-            reporter = db.collection('users').document(report_data['reporterId']).get()
-            reported = db.collection('users').document(report_data['reportedId']).get()
-            
-            if reporter.exists:
+            if reporter is not None:
                 report_data['reporter'] = {
                     'id': report_data['reporterId'],
-                    'name': reporter.to_dict().get('fullName')
+                    'name': reporter.get('fullName')
                 }
             
-            if reported.exists:
+            if reported is not None:
                 report_data['reported'] = {
                     'id': report_data['reportedId'],
-                    'name': reported.to_dict().get('fullName')
+                    'name': reported.get('fullName')
                 }
-            
-            result.append(report_data)
         
         return jsonify({"success": True, "reports": result})
         
@@ -217,16 +303,14 @@ def resolve_report(report_id):
                 'suspendedAt': datetime.utcnow(),
                 'suspensionReason': report_data.get('reason')
             })
+            get_profile_cache().invalidate(reported_user_id)
+            get_feed_builder().profile_changed(reported_user_id)
             
             # Notify user
-            db.collection('notifications').add({
-                'userId': reported_user_id,
-                'type': 'account_suspended',
-                'title': 'Account Suspended',
-                'message': f'Your account has been {action}ed due to policy violation.',
-                'read': False,
-                'createdAt': datetime.utcnow()
-            })
+            get_notification_outbox().enqueue(
+                reported_user_id, 'account_suspended', 'Account Suspended',
+                f'Your account has been {action}ed due to policy violation.'
+            )
         
         return jsonify({"success": True, "message": "Report resolved successfully"})
         
@@ -246,6 +330,7 @@ def set_featured_profile():
             'isFeatured': is_featured,
             'featuredAt': datetime.utcnow() if is_featured else None
         })
+        get_profile_cache().invalidate(user_id)
         
         return jsonify({"success": True})
         
@@ -255,52 +340,57 @@ def set_featured_profile():
 @bp.route('/broadcast', methods=['POST'])
 @require_admin
 def broadcast_notification():
-    """Send notification to all users or filtered group"""
+    """Send notification to all users or filtered group
+    
+    Runs as a background job; poll /broadcast/jobs/<job_id> for progress.
+    """
     try:
         data = request.json
         title = data.get('title')
         message = data.get('message')
         user_filter = data.get('filter', 'all')  # all, premium, verified
         
-        # Get target users
-        query = db.collection('users')
+        if not all([title, message]):
+            return jsonify({"error": "Missing required fields"}), 400
+        if user_filter not in BROADCAST_FILTERS:
+            return jsonify({"error": "Invalid filter"}), 400
         
-        if user_filter == 'premium':
-            query = query.where('isPremium', '==', True)
-        elif user_filter == 'verified':
-            query = query.where('verification.profileVerified', '==', True)
+        job_id = get_broadcast_runner().submit(title, message, user_filter, request.user_id)
         
-        users = query.stream()
-        
-        # Create notifications
-        batch = db.batch()
-        notification_count = 0
+        return jsonify({
+            "success": True,
+            "jobId": job_id,
+            "message": "Broadcast queued"
+        }), 202
         
-        for user in users:
-            notification_ref = db.collection('notifications').document()
-            batch.set(notification_ref, {
-                'userId': user.id,
-                'type': 'broadcast',
-                'title': title,
-                'message': message,
-                'read': False,
-                'createdAt': datetime.utcnow()
-            })
-            notification_count += 1
-            
-            # Commit in batches of 500 (Firestore limit)
-            if notification_count % 500 == 0:
-                batch.commit()
-                batch = db.batch()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@bp.route('/broadcast/jobs/<job_id>', methods=['GET'])
+@require_admin
+def get_broadcast_job(job_id):
+    """Get a broadcast job's status and progress"""
+    try:
+        job = job_status(db, job_id)
+        if job is None:
+            return jsonify({"error": "Job not found"}), 404
         
-        # Commit remaining
-        if notification_count % 500 != 0:
-            batch.commit()
+        return jsonify({"success": True, "job": job})
         
-        return jsonify({
-            "success": True,
-            "message": f"Notification sent to {notification_count} users"
-        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@bp.route('/broadcast/jobs/<job_id>/resume', methods=['POST'])
+@require_admin
+def resume_broadcast_job(job_id):
+    """Continue a failed or stalled broadcast from its last checkpoint"""
+    try:
+        get_broadcast_runner().resume(job_id)
+        return jsonify({"success": True, "jobId": job_id}), 202
         
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
     except Exception as e:
-        return jsonify({"error": str(e)}), 500 
+        return jsonify({"error": str(e)}), 500
@@ -1,11 +1,26 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from middleware.auth_middleware import require_auth
+from services.user_loader import get_user_loader
+from services.pagination import decode_page_cursor, encode_page_cursor
+from services.read_marks import read_marks
+from services.conversation_service import (
+    clear_unread_through, conversation_ref, get_or_create_conversation, with_conversation
+)
+from services.realtime_hub import hub, stream_events
+from services.notification_outbox import get_notification_outbox
+from google.api_core.exceptions import NotFound
+from firebase_admin import firestore
 from app import db
+from config import Config
 from datetime import datetime
+import time
 import uuid
 
 bp = Blueprint('chat', __name__, url_prefix='/api/chat')
 
+MAX_MESSAGES_PAGE = 200
+MAX_PRESENCE_USERS = 100
+
 @bp.route('/conversations', methods=['GET'])
 @require_auth
 def get_conversations():
@@ -23,20 +38,24 @@ def get_conversations():
         for conv in conversations:
             conv_data = conv.to_dict()
             conv_data['id'] = conv.id
-            
-            # Get other participant's info
-            other_user_id = [p for p in conv_data['participants'] if p != user_id][0]
-            other_user = db.collection('users').document(other_user_id).get()
-            
-            if other_user.exists:
-                other_user_data = other_user.to_dict()
+            result.append(conv_data)
+
+        # Get all other participants' info in one batch
+        other_ids = {}
+        for conv_data in result:
+            other_ids[conv_data['id']] = [p for p in conv_data['participants'] if p != user_id][0]
+        other_users = get_user_loader().load_many(other_ids.values(), fields=['fullName', 'photos'])
+
+        for conv_data in result:
+            other_user_id = other_ids[conv_data['id']]
+            other_user_data = other_users.get(other_user_id)
+
+            if other_user_data is not None:
                 conv_data['otherUser'] = {
                     'userId': other_user_id,
                     'fullName': other_user_data.get('fullName'),
                     'photo': other_user_data.get('photos', [{}])[0].get('url') if other_user_data.get('photos') else None
                 }
-            
-            result.append(conv_data)
         
         return jsonify(result)
         
@@ -56,80 +75,85 @@ def send_message():
         if not all([receiver_id, message_text]):
             return jsonify({"error": "Missing required fields"}), 400
         
-        # Find or create conversation
-        conv_id = get_or_create_conversation(sender_id, receiver_id)
-        
-        # Create message
-        message_data = {
-            'conversationId': conv_id,
-            'senderId': sender_id,
-            'receiverId': receiver_id,
-            'text': message_text,
-            'type': 'text',
-            'read': False,
-            'createdAt': datetime.utcnow()
-        }
-        
-        message_ref = db.collection('messages').add(message_data)
-        
-        # Update conversation
-        db.collection('conversations').document(conv_id).update({
-            'lastMessage': message_text,
-            'lastMessageAt': datetime.utcnow(),
-            f'unreadCount.{receiver_id}': firestore.Increment(1)
-        })
+        # The conversation ID follows from the pair, so no lookup is needed;
+        # the very first message finds no document and creates it
+        conv_ref = conversation_ref(sender_id, receiver_id)
+        try:
+            message = commit_message(conv_ref, sender_id, receiver_id, message_text)
+        except NotFound:
+            get_or_create_conversation(sender_id, receiver_id)
+            message = commit_message(conv_ref, sender_id, receiver_id, message_text)
+        
+        # Push to both sides; the sender may have the chat open elsewhere too
+        hub.publish([sender_id, receiver_id], 'message', message)
         
         # Send notification
-        db.collection('notifications').add({
-            'userId': receiver_id,
-            'type': 'new_message',
-            'title': 'New Message',
-            'message': message_text[:50],
-            'senderId': sender_id,
-            'read': False,
-            'createdAt': datetime.utcnow()
-        })
+        get_notification_outbox().enqueue(
+            receiver_id, 'new_message', 'New Message', message_text[:50], senderId=sender_id
+        )
         
         return jsonify({
             "success": True,
-            "messageId": message_ref[1].id
+            "messageId": message['id']
         }), 201
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-def get_or_create_conversation(user1_id, user2_id):
-    """Find existing conversation or create new one"""
-    # Create consistent participant list
-    participants = sorted([user1_id, user2_id])
-    
-    # Check if conversation exists
-    existing = db.collection('conversations')\
-        .where('participants', '==', participants)\
-        .limit(1)\
-        .get()
+def commit_message(conv_ref, sender_id, receiver_id, message_text):
+    """Write a message and the conversation update as one batch
     
-    if existing:
-        return existing[0].id
+    Returns the message as get_messages lists it. Raises NotFound, writing
+    nothing, if the conversation does not exist.
+    """
+    now = datetime.utcnow()
+    batch = db.batch()
     
-    # Create new conversation
-    conv_data = {
-        'participants': participants,
-        'createdAt': datetime.utcnow(),
-        'lastMessage': '',
-        'lastMessageAt': datetime.utcnow(),
-        'unreadCount': {user1_id: 0, user2_id: 0}
+    # Create message
+    message_ref = db.collection('messages').document()
+    message = {
+        'conversationId': conv_ref.id,
+        'senderId': sender_id,
+        'receiverId': receiver_id,
+        'text': message_text,
+        'type': 'text',
+        'read': False,
+        'createdAt': now
     }
+    batch.set(message_ref, message)
     
-    conv_ref = db.collection('conversations').add(conv_data)
-    return conv_ref[1].id
+    # Update conversation
+    batch.update(conv_ref, {
+        'lastMessage': message_text,
+        'lastMessageAt': now,
+        f'unreadCount.{receiver_id}': firestore.Increment(1)
+    })
+    
+    batch.commit()
+    return dict(message, id=message_ref.id)
 
 @bp.route('/messages/<conversation_id>', methods=['GET'])
 @require_auth
 def get_messages(conversation_id):
-    """Get all messages in a conversation"""
+    """Get one page of messages in a conversation, oldest first
+    
+    With no cursor the latest page is returned. `before` pages back through
+    history; `since` returns only messages newer than a previous response.
+    """
     try:
         user_id = request.user_id
+        limit = max(1, min(request.args.get('limit', 50, type=int), MAX_MESSAGES_PAGE))
+        
+        if request.args.get('before') and request.args.get('since'):
+            return jsonify({"error": "Use either before or since, not both"}), 400
+        
+        try:
+            before = request.args.get('before')
+            since = request.args.get('since')
+            before = decode_page_cursor(before) if before else None
+            since = decode_page_cursor(since) if since else None
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
         # Verify user is participant
         conv_doc = db.collection('conversations').document(conversation_id).get()
@@ -140,25 +164,158 @@ def get_messages(conversation_id):
         if user_id not in conv_data['participants']:
             return jsonify({"error": "Unauthorized"}), 403
         
-        # Get messages
-        messages = db.collection('messages')\
+        # Get messages (served by the conversationId + createdAt indexes)
+        direction = 'ASCENDING' if since else 'DESCENDING'
+        query = db.collection('messages')\
             .where('conversationId', '==', conversation_id)\
-            .order_by('createdAt', direction='ASCENDING')\
-            .stream()
+            .order_by('createdAt', direction=direction)\
+            .order_by(firestore.FieldPath.document_id(), direction=direction)
+        
+        after = since or before
+        if after:
+            created_at, message_id = after
+            query = query.start_after({
+                'createdAt': created_at,
+                '__name__': db.collection('messages').document(message_id)
+            })
         
         result = []
-        for msg in messages:
+        for msg in query.limit(limit).stream():
             msg_data = msg.to_dict()
             msg_data['id'] = msg.id
-            msg_data['createdAt'] = msg_data['createdAt'].isoformat()
             result.append(msg_data)
+        if not since:
+            result.reverse()
+        
+        # Cursors: further back in history, and the newest message the client has
+        older = None
+        if not since and len(result) == limit:
+            older = encode_page_cursor(result[0]['createdAt'], result[0]['id'])
+        newest = None
+        if not before:
+            newest = encode_page_cursor(result[-1]['createdAt'], result[-1]['id']) if result \
+                else request.args.get('since')
         
-        # Mark messages as read
-        db.collection('conversations').document(conversation_id).update({
-            f'unreadCount.{user_id}': 0
+        # Mark messages as read, skipping no-op writes and coalescing repeats
+        unread = (conv_data.get('unreadCount') or {}).get(user_id, 0)
+        if unread:
+            conv_ref = db.collection('conversations').document(conversation_id)
+            read_through = conv_data.get('lastMessageAt') or datetime.utcnow()
+            read_marks.mark(conversation_id, user_id,
+                            lambda: conv_ref.update({f'unreadCount.{user_id}': 0}),
+                            lambda: clear_unread_through(conv_ref, user_id, read_through))
+            hub.publish(conv_data['participants'], 'read', {
+                'conversationId': conversation_id,
+                'userId': user_id,
+                'readAt': datetime.utcnow()
+            })
+        
+        return jsonify({
+            "success": True,
+            "messages": result,
+            "before": older,
+            "since": newest,
+            "hasMore": len(result) == limit
         })
         
-        return jsonify(result)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@bp.route('/stream', methods=['GET'])
+@require_auth
+def stream():
+    """Server-sent events for the current user: message, typing and read
+    
+    Opening a stream marks the user online. Events only reach streams on
+    the worker that handled them, so clients also poll with `since` at a
+    low rate. A stream is closed after CHAT_STREAM_MAX_SECONDS, or sooner
+    when the ID token expires, and the client reconnects. Each open stream
+    holds a thread; gunicorn.conf.py runs threaded workers for that.
+    """
+    expires_at = time.time() + Config.CHAT_STREAM_MAX_SECONDS
+    if request.claims.get('exp'):
+        expires_at = min(expires_at, request.claims['exp'])
+    
+    subscription = hub.subscribe(request.user_id)
+    return Response(
+        stream_events(hub, subscription, expires_at=expires_at),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@bp.route('/typing', methods=['POST'])
+@require_auth
+def send_typing():
+    """Tell the other participant the current user is typing"""
+    try:
+        receiver_id = (request.json or {}).get('receiverId')
+        if not receiver_id:
+            return jsonify({"error": "Missing required fields"}), 400
+        
+        # Only to someone the user is already talking to
+        if not with_conversation(request.user_id, [receiver_id]):
+            return jsonify({"error": "Unauthorized"}), 403
+        
+        hub.publish([receiver_id], 'typing', {
+            'conversationId': conversation_ref(request.user_id, receiver_id).id,
+            'userId': request.user_id
+        })
+        return jsonify({"success": True})
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@bp.route('/read', methods=['POST'])
+@require_auth
+def mark_read():
+    """Mark the conversation with another user as read and send a read receipt
+    
+    For messages that arrived over the stream, so the client need not
+    fetch them again to mark them read.
+    """
+    try:
+        user_id = request.user_id
+        other_user_id = (request.json or {}).get('otherUserId')
+        if not other_user_id:
+            return jsonify({"error": "Missing required fields"}), 400
+        
+        conv_ref = conversation_ref(user_id, other_user_id)
+        read_through = datetime.utcnow()
+        try:
+            read_marks.mark(conv_ref.id, user_id,
+                            lambda: conv_ref.update({f'unreadCount.{user_id}': 0}),
+                            lambda: clear_unread_through(conv_ref, user_id, read_through))
+        except NotFound:
+            return jsonify({"error": "Conversation not found"}), 404
+        
+        hub.publish([user_id, other_user_id], 'read', {
+            'conversationId': conv_ref.id,
+            'userId': user_id,
+            'readAt': datetime.utcnow()
+        })
+        return jsonify({"success": True})
         
     except Exception as e:
-        return jsonify({"error": str(e)}), 500 
+        return jsonify({"error": str(e)}), 500
+
+@bp.route('/presence', methods=['GET'])
+@require_auth
+def get_presence():
+    """Online status and last-seen time of the given users on this server
+    
+    Only users the caller has a conversation with are reported; others
+    are left out of the result.
+    """
+    try:
+        user_ids = [u for u in request.args.get('userIds', '').split(',') if u]
+        if len(user_ids) > MAX_PRESENCE_USERS:
+            return jsonify({"error": f"At most {MAX_PRESENCE_USERS} users per request"}), 400
+        
+        visible = with_conversation(request.user_id, user_ids)
+        return jsonify({
+            "success": True,
+            "presence": hub.presence([u for u in user_ids if u in visible])
+        })
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
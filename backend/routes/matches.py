@@ -1,6 +1,11 @@
 from flask import Blueprint, request, jsonify
 from middleware.auth_middleware import require_auth
-from services.matching_service import find_matches
+from services.matching_service import find_match_page
+from services.result_cache import encode_cursor
+from services.seen_pairs import get_seen_pairs
+from services.feed_service import get_feed_builder, expand_feed
+from services.stats_service import increment
+from services.notification_outbox import get_notification_outbox
 from app import db
 from datetime import datetime
 
@@ -12,13 +17,37 @@ def discover_matches():
     try:
         user_id = request.user_id
         limit = request.args.get('limit', 20, type=int)
-        
-        matches = find_matches(user_id, limit)
+        cursor = request.args.get('cursor')
+        
+        matches = None
+        next_cursor = None
+        
+        # Serve the first page from the precomputed feed while it is fresh
+        feed_builder = get_feed_builder()
+        if not cursor and 0 < limit <= feed_builder.feed_size:
+            feed = feed_builder.read_feed(user_id)
+            if feed is not None:
+                matches = expand_feed(user_id, feed, limit)
+                if matches is not None and len(matches) < min(limit, len(feed)):
+                    feed_builder.request_rebuild(user_id, mark_stale=False)  # Members went inactive or were seen
+                if matches and len(matches) == limit:
+                    next_cursor = encode_cursor(matches[-1]['matchScore'], matches[-1]['userId'])
+        
+        # Otherwise page through the cached live ranking
+        if matches is None:
+            try:
+                matches, next_cursor = find_match_page(user_id, limit, cursor)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            # Only pages the feed could serve are worth building it for
+            if not cursor and 0 < limit <= feed_builder.feed_size:
+                feed_builder.request_rebuild(user_id, mark_stale=False)
         
         return jsonify({
             "success": True,
             "matches": matches,
-            "count": len(matches)
+            "count": len(matches),
+            "nextCursor": next_cursor
         })
         
     except Exception as e:
@@ -54,22 +83,22 @@ def send_match_request():
             'createdAt': datetime.utcnow()
         }
         
-        match_ref = db.collection('matches').add(match_data)
+        match_ref = db.collection('matches').document()
+        batch = db.batch()
+        batch.set(match_ref, match_data)
+        increment(db, 'totalMatches', 1, batch)
+        batch.commit()
+        get_seen_pairs().mark(sender_id, receiver_id)
         
         # Create notification for receiver
-        db.collection('notifications').add({
-            'userId': receiver_id,
-            'type': 'match_request',
-            'title': 'New Match Request',
-            'message': 'Someone is interested in your profile',
-            'matchId': match_ref[1].id,
-            'read': False,
-            'createdAt': datetime.utcnow()
-        })
+        get_notification_outbox().enqueue(
+            receiver_id, 'match_request', 'New Match Request',
+            'Someone is interested in your profile', matchId=match_ref.id
+        )
         
         return jsonify({
             "success": True,
-            "matchId": match_ref[1].id
+            "matchId": match_ref.id
         }), 201
         
     except Exception as e:
@@ -103,17 +132,13 @@ def respond_to_request():
             'status': 'accepted' if action == 'accept' else 'rejected',
             'respondedAt': datetime.utcnow()
         })
+        get_seen_pairs().mark(request.user_id, match_data['senderId'])
         
         # Notify sender
-        db.collection('notifications').add({
-            'userId': match_data['senderId'],
-            'type': 'match_response',
-            'title': f'Match Request {action.capitalize()}ed',
-            'message': f'Your request was {action}ed',
-            'matchId': match_id,
-            'read': False,
-            'createdAt': datetime.utcnow()
-        })
+        get_notification_outbox().enqueue(
+            match_data['senderId'], 'match_response', f'Match Request {action.capitalize()}ed',
+            f'Your request was {action}ed', matchId=match_id
+        )
         
         return jsonify({"success": True})
         
@@ -1,7 +1,11 @@
 from flask import Blueprint, request, jsonify
 from middleware.auth_middleware import require_auth
+from services.profile_cache import get_profile_cache
+from services.claims_service import premium_from_claims, to_epoch, update_claims
+from services.stats_service import increment
+from services.notification_outbox import get_notification_outbox
 from app import db
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import razorpay
 import os
 
@@ -126,22 +130,26 @@ def verify_payment():
         # Activate premium subscription
         expiry_date = datetime.utcnow() + timedelta(days=plan['duration_days'])
         
-        db.collection('users').document(request.user_id).update({
+        user_ref = db.collection('users').document(request.user_id)
+        was_premium = (user_ref.get(field_paths=['isPremium']).to_dict() or {}).get('isPremium')
+        batch = db.batch()
+        batch.update(user_ref, {
             'isPremium': True,
             'premiumPlan': plan_id,
             'premiumActivatedAt': datetime.utcnow(),
             'premiumExpiresAt': expiry_date
         })
+        if not was_premium:
+            increment(db, 'premiumUsers', 1, batch)
+        batch.commit()
+        get_profile_cache().invalidate(request.user_id)
+        update_claims(request.user_id, premium=True, premiumPlan=plan_id, premiumExpiresAt=to_epoch(expiry_date))
         
         # Send confirmation notification
-        db.collection('notifications').add({
-            'userId': request.user_id,
-            'type': 'payment_success',
-            'title': 'Premium Activated',
-            'message': f'Your {plan["name"]} subscription is now active!',
-            'read': False,
-            'createdAt': datetime.utcnow()
-        })
+        get_notification_outbox().enqueue(
+            request.user_id, 'payment_success', 'Premium Activated',
+            f'Your {plan["name"]} subscription is now active!'
+        )
         
         return jsonify({
             "success": True,
@@ -159,6 +167,16 @@ def verify_payment():
 def get_subscription_status():
     """Get current subscription status"""
     try:
+        # An active subscription in the token's claims needs no document read
+        if premium_from_claims(request.claims):
+            expires_at = request.claims.get('premiumExpiresAt')
+            return jsonify({
+                "success": True,
+                "isPremium": True,
+                "plan": request.claims.get('premiumPlan'),
+                "expiresAt": datetime.fromtimestamp(expires_at, timezone.utc).isoformat() if expires_at else None
+            })
+        
         user_doc = db.collection('users').document(request.user_id).get()
         
         if not user_doc.exists:
@@ -173,9 +191,14 @@ def get_subscription_status():
         if is_premium and expires_at:
             if datetime.utcnow() > expires_at:
                 # Deactivate premium
-                db.collection('users').document(request.user_id).update({
+                batch = db.batch()
+                batch.update(db.collection('users').document(request.user_id), {
                     'isPremium': False
                 })
+                increment(db, 'premiumUsers', -1, batch)
+                batch.commit()
+                get_profile_cache().invalidate(request.user_id)
+                update_claims(request.user_id, premium=False, premiumPlan=None, premiumExpiresAt=None)
                 is_premium = False
         
         return jsonify({
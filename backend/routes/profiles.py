@@ -1,7 +1,15 @@
 from flask import Blueprint, request, jsonify
 from middleware.auth_middleware import require_auth
 from services.cloudinary_service import upload_media
+from services.feed_service import get_feed_builder
+from services.profile_features import ProfileFeatures
+from services.geo_service import location_for
+from services.profile_cache import get_profile_cache
+from services.profile_views import apply_privacy
+from services.claims_service import claims_from_profile, update_claims
+from services.stats_service import record_profile_change
 from app import db
+from config import Config
 from datetime import datetime
 
 bp = Blueprint('profiles', __name__, url_prefix='/api/profiles')
@@ -13,6 +21,13 @@ def create_profile():
         data = request.json
         user_id = request.user_id
         
+        tech_stack = data.get('techStack') or []
+        if not isinstance(tech_stack, list) or len(tech_stack) > Config.TECH_STACK_MAX_TERMS or \
+                not all(isinstance(t, str) and len(t.strip()) <= Config.TECH_TERM_MAX_LENGTH for t in tech_stack):
+            return jsonify({"error": f"techStack must list at most {Config.TECH_STACK_MAX_TERMS} technologies "
+                                     f"of up to {Config.TECH_TERM_MAX_LENGTH} characters"}), 400
+        tech_stack = [t.strip() for t in tech_stack if t.strip()]
+        
         profile_data = {
             # Personal Info
             'userId': user_id,
@@ -27,12 +42,13 @@ def create_profile():
             'city': data.get('city'),
             'state': data.get('state'),
             'country': data.get('country'),
+            'location': location_for(data.get('city')),
             
             # Developer Info
             'developerInfo': {
                 'role': data.get('role'),
                 'yearsOfExperience': data.get('yearsOfExperience'),
-                'techStack': data.get('techStack', []),
+                'techStack': tech_stack,
                 'workType': data.get('workType'),
                 'companyName': data.get('companyName'),
                 'githubUrl': data.get('githubUrl'),
@@ -47,7 +63,7 @@ def create_profile():
                 'communities': data.get('preferredCommunities', []),
                 'techPreferences': data.get('techPreferences', []),
                 'workPreference': data.get('workPreference'),
-                'locationRadius': data.get('locationRadius', 50)
+                'locationRadius': data.get('locationRadius')  # km; None matches by city/state
             },
             
             # Privacy
@@ -72,8 +88,22 @@ def create_profile():
             'isPremium': False
         }
         
-        # Save to Firestore
-        db.collection('users').document(user_id).set(profile_data)
+        # Matching inputs, normalized once at write time; the only place new
+        # technologies are added to the shared vocabulary
+        profile_data['features'] = ProfileFeatures.from_profile(profile_data, intern=True).to_document()
+        
+        # Save to Firestore, moving the dashboard counters with it
+        user_ref = db.collection('users').document(user_id)
+        previous = user_ref.get(field_paths=['isPremium', 'verification.profileVerified'])
+        batch = db.batch()
+        batch.set(user_ref, profile_data)
+        record_profile_change(db, previous.to_dict() if previous.exists else None, profile_data, batch)
+        batch.commit()
+        get_profile_cache().invalidate(user_id)
+        update_claims(user_id, **claims_from_profile(profile_data))
+        
+        # Refresh this user's feed and any feeds they now belong in
+        get_feed_builder().profile_changed(user_id, profile_data)
         
         return jsonify({
             "success": True,
@@ -106,6 +136,7 @@ def upload_photo():
                 'uploadedAt': datetime.utcnow()
             }])
         })
+        get_profile_cache().invalidate(user_id)
         
         return jsonify({
             "success": True,
@@ -119,21 +150,13 @@ def upload_photo():
 @require_auth
 def get_profile(user_id):
     try:
-        user_doc = db.collection('users').document(user_id).get()
+        profile = get_profile_cache().get(user_id)
         
-        if not user_doc.exists:
+        if profile is None:
             return jsonify({"error": "Profile not found"}), 404
         
-        profile = user_doc.to_dict()
-        
-        # Apply privacy filters if not own profile
-        if request.user_id != user_id:
-            if profile.get('privacy', {}).get('hideContact'):
-                profile.pop('phone', None)
-                profile.pop('email', None)
-            
-            if profile.get('privacy', {}).get('hidePhotos'):
-                profile['photos'] = []
+        # Drop internal fields, and apply privacy filters if not own profile
+        apply_privacy(profile, request.user_id, user_id)
         
         return jsonify(profile)
         
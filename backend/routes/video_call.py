@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from middleware.auth_middleware import require_auth
+from services.notification_outbox import get_notification_outbox
 from app import db
 from datetime import datetime
 import secrets
@@ -43,15 +44,10 @@ def create_room():
         db.collection('video_rooms').document(room_id).set(room_data)
         
         # Notify participant
-        db.collection('notifications').add({
-            'userId': participant_id,
-            'type': 'video_call',
-            'title': 'Incoming Video Call',
-            'message': 'Someone is calling you',
-            'roomId': room_id,
-            'read': False,
-            'createdAt': datetime.utcnow()
-        })
+        get_notification_outbox().enqueue(
+            participant_id, 'video_call', 'Incoming Video Call',
+            'Someone is calling you', roomId=room_id
+        )
         
         return jsonify({
             "success": True,
@@ -0,0 +1,51 @@
+"""Drop the locationRadius every profile was given by default.
+
+create_profile used to store locationRadius 50 when the client sent
+none, and the app never sends one, so every stored 50 is that default
+rather than a choice. Radius matching only applies to a chosen radius,
+so this clears those values and the profiles go back to city/state
+matching. Running it again is harmless. Run from backend/:
+
+    python -m scripts.clear_default_location_radius --dry-run
+    python -m scripts.clear_default_location_radius
+"""
+import argparse
+import sys
+from app import db
+
+BATCH_LIMIT = 500  # Firestore's cap on writes per batch
+DEFAULT_RADIUS = 50
+
+def clear_defaults(dry_run=False):
+    cleared = 0
+    batch = db.batch()
+    pending = 0
+    users = db.collection('users')\
+        .where('preferences.locationRadius', '==', DEFAULT_RADIUS)\
+        .select([])\
+        .stream()
+    for user in users:
+        cleared += 1
+        if dry_run:
+            continue
+        batch.update(user.reference, {'preferences.locationRadius': None})
+        pending += 1
+        if pending == BATCH_LIMIT:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+    if pending:
+        batch.commit()
+
+    action = 'Would clear' if dry_run else 'Cleared'
+    print(f'{action} the default radius on {cleared} profiles')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dry-run', action='store_true', help='report what would change without writing')
+    args = parser.parse_args(argv)
+    clear_defaults(dry_run=args.dry_run)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""Move conversations to IDs derived from their participant pair.
+
+Conversations created before deterministic IDs have random document IDs,
+and a pair may even have more than one. This copies each into the
+document named by conversation_id(), merging duplicates, repoints the
+pair's messages at it and deletes the old document. Running it again is
+harmless. Run it right after deploying, from backend/:
+
+    python -m scripts.migrate_conversation_ids --dry-run
+    python -m scripts.migrate_conversation_ids
+"""
+import argparse
+import sys
+from app import db
+from services.conversation_service import conversation_id
+
+BATCH_LIMIT = 500  # Firestore's cap on writes per batch
+
+def merge_conversations(target, source):
+    """Combine two conversation documents for the same pair"""
+    if target is None:
+        return dict(source)
+    merged = dict(target)
+    if source.get('lastMessageAt') and \
+            (not target.get('lastMessageAt') or source['lastMessageAt'] > target['lastMessageAt']):
+        merged['lastMessage'] = source.get('lastMessage', '')
+        merged['lastMessageAt'] = source['lastMessageAt']
+    if source.get('createdAt') and (not target.get('createdAt') or source['createdAt'] < target['createdAt']):
+        merged['createdAt'] = source['createdAt']
+    unread = dict(target.get('unreadCount') or {})
+    for user_id, count in (source.get('unreadCount') or {}).items():
+        unread[user_id] = unread.get(user_id, 0) + (count or 0)
+    merged['unreadCount'] = unread
+    return merged
+
+def repoint_messages(old_id, new_id, dry_run):
+    """Point every message of old_id at new_id; returns how many moved"""
+    moved = 0
+    batch = db.batch()
+    pending = 0
+    messages = db.collection('messages').where('conversationId', '==', old_id).select([]).stream()
+    for message in messages:
+        moved += 1
+        if dry_run:
+            continue
+        batch.update(message.reference, {'conversationId': new_id})
+        pending += 1
+        if pending == BATCH_LIMIT:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+    if pending:
+        batch.commit()
+    return moved
+
+def migrate(dry_run=False):
+    conversations_moved = 0
+    messages_moved = 0
+    for conv in db.collection('conversations').stream():
+        data = conv.to_dict()
+        participants = data.get('participants') or []
+        if len(participants) != 2:
+            print(f'Skipping {conv.id}: participants {participants!r}')
+            continue
+
+        new_id = conversation_id(*participants)
+        if conv.id == new_id:
+            continue
+
+        target_ref = db.collection('conversations').document(new_id)
+        target = target_ref.get()
+        if target.exists and conv.id in (target.to_dict().get('migratedFrom') or []):
+            # Merged by an earlier, interrupted run; only the delete is left
+            if not dry_run:
+                conv.reference.delete()
+            continue
+
+        merged = merge_conversations(target.to_dict() if target.exists else None, data)
+        merged['participants'] = sorted(participants)
+        merged['migratedFrom'] = sorted(set((merged.get('migratedFrom') or []) + [conv.id]))
+
+        # Messages first, so an interrupted run leaves the old document to retry from
+        messages_moved += repoint_messages(conv.id, new_id, dry_run)
+        if not dry_run:
+            target_ref.set(merged)
+            conv.reference.delete()
+        conversations_moved += 1
+        print(f'{conv.id} -> {new_id}')
+
+    action = 'Would move' if dry_run else 'Moved'
+    print(f'{action} {conversations_moved} conversations and {messages_moved} messages')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dry-run', action='store_true', help='report what would move without writing')
+    args = parser.parse_args(argv)
+    migrate(dry_run=args.dry_run)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
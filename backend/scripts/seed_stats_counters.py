@@ -0,0 +1,38 @@
+"""Seed the admin dashboard counters from count() aggregations.
+
+The sharded counters in stats/{name} only see writes made after they
+were introduced. This sets each one to a count of the documents it
+stands for, once. Until a counter is seeded the dashboard counts it
+on every load. Run it once after deploying, while traffic is quiet,
+from backend/:
+
+    python -m scripts.seed_stats_counters
+    python -m scripts.seed_stats_counters --force totalMatches   # reseed
+"""
+import argparse
+import sys
+from app import db
+from services.stats_service import COUNTERS, seed_counter
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('counters', nargs='*', metavar='counter',
+                        help=f"counters to seed (default: all): {', '.join(COUNTERS)}")
+    parser.add_argument('--force', action='store_true', help='reseed counters that were already seeded')
+    args = parser.parse_args(argv)
+
+    # Checked here: argparse applies choices to the empty default list as a whole
+    unknown = [name for name in args.counters if name not in COUNTERS]
+    if unknown:
+        parser.error(f"unknown counter: {', '.join(unknown)}")
+
+    for name in args.counters or list(COUNTERS):
+        value = seed_counter(db, name, force=args.force)
+        if value is None:
+            print(f'{name}: already seeded, skipped')
+        else:
+            print(f'{name}: seeded at {value}')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
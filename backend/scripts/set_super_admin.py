@@ -0,0 +1,34 @@
+"""Grant or revoke the superAdmin claim.
+
+Only a super admin can grant or revoke admin access through
+POST /api/admin/users/<id>/admin, and no route can make one, so it is
+set here with the service account. A revocation also ends the user's
+sessions. Run from backend/:
+
+    python -m scripts.set_super_admin <uid>
+    python -m scripts.set_super_admin <uid> --revoke
+"""
+import argparse
+import sys
+from firebase_admin import auth
+import app  # noqa: F401  (initializes the Firebase app)
+from services.claims_service import update_claims
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('uid', help='Firebase Auth user ID')
+    parser.add_argument('--revoke', action='store_true', help='remove the claim instead of granting it')
+    args = parser.parse_args(argv)
+
+    # A None value removes the claim
+    if not update_claims(args.uid, superAdmin=None if args.revoke else True):
+        return 1
+    if args.revoke:
+        auth.revoke_refresh_tokens(args.uid)
+        print(f'{args.uid}: superAdmin revoked, sessions ended')
+    else:
+        print(f'{args.uid}: superAdmin granted; takes effect on the next token refresh')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
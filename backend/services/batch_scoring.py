@@ -0,0 +1,367 @@
+import bisect
+import threading
+import numpy as np
+from datetime import datetime
+from services.geo_service import covering_prefixes, haversine_km, proximity_points
+from services.profile_features import ProfileFeatures, values, as_number
+from services.tech_vocabulary import tech_mask
+
+# Scores from score_candidates must stay identical to calculate_match_score,
+# so every component below mirrors the scalar version step for step.
+
+_BYTE_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def _developer_info(profile):
+    return profile.get('developerInfo') or {}
+
+def _tech_words(masks, n_words):
+    """Split integer bitmasks into rows of little-endian uint64 words"""
+    raw = b''.join(mask.to_bytes(n_words * 8, 'little') for mask in masks)
+    return np.frombuffer(raw, dtype='<u8').astype(np.uint64).reshape(len(masks), n_words)
+
+def _popcount(words):
+    """Count set bits per row of a 2-D uint64 array"""
+    as_bytes = np.ascontiguousarray(words).view(np.uint8)
+    return _BYTE_POPCOUNT[as_bytes].sum(axis=1, dtype=np.int64)
+
+class CandidateColumns:
+    """Columnar view of a candidate pool, built once and scored many times"""
+
+    def __init__(self, candidates, features=None):
+        """candidates is a sequence of (user_id, profile_dict) pairs
+
+        features, when given, holds the matching ProfileFeatures so callers
+        that keep them around skip loading them again.
+        """
+        n = len(candidates)
+        self.ids = [candidate_id for candidate_id, _ in candidates]
+        self.profiles = [profile for _, profile in candidates]
+        if features is None:
+            features = [ProfileFeatures.load(profile) for profile in self.profiles]
+
+        self.birth_year = np.fromiter((f.birth_year for f in features), dtype=np.int32, count=n)
+        self.birth_mmdd = np.fromiter((f.birth_mmdd for f in features), dtype=np.int32, count=n)
+        self.has_dob = self.birth_year > 0
+        self.religion = np.fromiter((f.religion for f in features), dtype=np.int64, count=n)
+        self.city = np.fromiter((f.city for f in features), dtype=np.int64, count=n)
+        self.state = np.fromiter((f.state for f in features), dtype=np.int64, count=n)
+        self.work_type = np.fromiter((f.work_type for f in features), dtype=np.int64, count=n)
+        self.experience = np.fromiter((f.experience for f in features), dtype=np.float64, count=n)
+
+        tech_masks = [f.tech_mask for f in features]
+        widest = max((mask.bit_length() for mask in tech_masks), default=0)
+        self.n_words = max(1, (widest + 63) // 64)
+        self.tech = _tech_words(tech_masks, self.n_words)
+        self.has_tech = self.tech.any(axis=1)
+
+        self.lat = np.fromiter((f.lat for f in features), dtype=np.float64, count=n)
+        self.lng = np.fromiter((f.lng for f in features), dtype=np.float64, count=n)
+        self.has_location = ~np.isnan(self.lat)
+
+        # Rows with a location, sorted by geohash for prefix range lookups
+        located = np.flatnonzero(self.has_location)
+        order = sorted(range(len(located)), key=lambda i: features[located[i]].geohash)
+        self.geo_rows = located[order]
+        self.geohashes = [features[row].geohash for row in self.geo_rows]
+        self._preferences = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def ages(self, today=None):
+        """Ages as of today, 0 where dateOfBirth is missing or malformed"""
+        today = today or datetime.today()
+        today_mmdd = today.month * 100 + today.day
+        ages = today.year - self.birth_year - (today_mmdd < self.birth_mmdd)
+        return np.where(self.has_dob, ages, 0)
+
+    def preferences(self):
+        """UserPreferences for these rows, built on first use"""
+        if self._preferences is None:
+            self._preferences = UserPreferences(self)
+        return self._preferences
+
+    def distances_within(self, lat, lng, radius_km):
+        """Distances in km from (lat, lng); inf for located rows outside the
+        geohash cells covering radius_km, NaN for rows without a location"""
+        distances = np.where(self.has_location, np.inf, np.nan)
+        rows = []
+        for prefix in covering_prefixes(lat, lng, radius_km):
+            start = bisect.bisect_left(self.geohashes, prefix)
+            end = bisect.bisect_left(self.geohashes, prefix + '~')
+            rows.append(self.geo_rows[start:end])
+        rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+        distances[rows] = haversine_km(lat, lng, self.lat[rows], self.lng[rows])
+        return distances
+
+class UserPreferences:
+    """Columnar view of what each user in a pool looks for in a match
+
+    The other side of CandidateColumns: lets one profile be scored as the
+    candidate of every user in the pool at once.
+    """
+
+    def __init__(self, columns):
+        n = len(columns)
+        prefs = [profile.get('preferences', {}) for profile in columns.profiles]
+        age_ranges = [user_prefs.get('ageRange', {'min': 22, 'max': 35}) for user_prefs in prefs]
+        self.age_min = np.array([age_range['min'] for age_range in age_ranges], dtype=np.float64)
+        self.age_max = np.array([age_range['max'] for age_range in age_ranges], dtype=np.float64)
+
+        # Preferred religions as (row, code) pairs; rows without any accept all
+        religion_rows = []
+        religion_codes = []
+        for row, user_prefs in enumerate(prefs):
+            for religion in user_prefs.get('religions', []) or []:
+                religion_rows.append(row)
+                religion_codes.append(values.lookup(religion))
+        self.religion_rows = np.array(religion_rows, dtype=np.int64)
+        self.religion_codes = np.array(religion_codes, dtype=np.int64)
+        self.any_religion = np.ones(n, dtype=bool)
+        self.any_religion[self.religion_rows] = False
+
+        work = [user_prefs.get('workPreference') for user_prefs in prefs]
+        self.any_work = np.array([not preferred for preferred in work], dtype=bool)
+        self.work_type = np.array([values.lookup(preferred) if preferred else -1 for preferred in work],
+                                  dtype=np.int64)
+
+        # Same rule as location_search: a chosen radius and a known location
+        self.radius = np.array([as_number(user_prefs.get('locationRadius')) for user_prefs in prefs],
+                               dtype=np.float64)
+        self.has_search = (self.radius > 0) & columns.has_location
+        self.tech_bits = _popcount(columns.tech)
+
+def location_search(user_profile):
+    """(lat, lng, radius_km) when radius matching applies to this user, else None
+
+    Only a radius the user chose applies; without one, candidates keep
+    the city/state comparison.
+    """
+    radius = as_number((user_profile.get('preferences') or {}).get('locationRadius'))
+    if radius <= 0:
+        return None
+    features = ProfileFeatures.load(user_profile)
+    if not features.has_location:
+        return None
+    return features.lat, features.lng, radius
+
+def _codes_for(vocabulary, items):
+    return np.array([vocabulary.lookup(item) for item in items], dtype=np.int64)
+
+def _cheap_components(user_profile, columns, search=None, distances=None, today=None):
+    """Every integer-valued score component; tech overlap is scored separately"""
+    n = len(columns)
+    user_prefs = user_profile.get('preferences', {})
+    user_dev = _developer_info(user_profile)
+
+    # Age compatibility (20 points)
+    age_range = user_prefs.get('ageRange', {'min': 22, 'max': 35})
+    ages = columns.ages(today)
+    age_points = np.where((age_range['min'] <= ages) & (ages <= age_range['max']), 20, 0)
+
+    # Religion/Community match (15 points)
+    preferred_religions = user_prefs.get('religions', [])
+    if not preferred_religions:
+        religion_points = np.full(n, 15)
+    else:
+        religion_ok = np.isin(columns.religion, _codes_for(values, preferred_religions))
+        religion_points = np.where(religion_ok, 15, 0)
+
+    # Experience level compatibility (15 points)
+    exp_diff = np.abs(as_number(user_dev.get('yearsOfExperience', 0)) - columns.experience)
+    exp_points = np.where(exp_diff <= 2, 15, np.where(exp_diff <= 5, 10, 0))
+
+    # Location proximity (15 points)
+    same_city = columns.city == values.lookup(user_profile.get('city'))
+    same_state = columns.state == values.lookup(user_profile.get('state'))
+    location_points = np.where(same_city, 15, np.where(same_state, 10, 0))
+    if search is not None:
+        # Both located: points scale with distance instead
+        both = columns.has_location
+        scaled = proximity_points(np.where(both, distances, np.inf), search[2])
+        location_points = np.where(both, scaled, location_points)
+
+    # Work type match (10 points)
+    preferred_work = user_prefs.get('workPreference')
+    if not preferred_work:
+        work_points = np.full(n, 10)
+    else:
+        work_points = np.where(columns.work_type == values.lookup(preferred_work), 10, 0)
+
+    return age_points + religion_points, exp_points + location_points + work_points, (
+        exp_points, location_points, work_points
+    )
+
+def _tech_points(user_tech, columns, rows):
+    """Tech stack overlap (25 points) for the selected rows"""
+    if not user_tech:
+        return np.zeros(len(rows), dtype=np.float64)
+
+    # Bits beyond the widest candidate mask cannot overlap anything
+    user_words = _tech_words([user_tech & ((1 << columns.n_words * 64) - 1)], columns.n_words)
+    overlap = _popcount(columns.tech[rows] & user_words)
+    return np.where(
+        columns.has_tech[rows],
+        np.minimum(25, (overlap / user_tech.bit_count()) * 25),
+        0.0
+    )
+
+def _final_scores(head, tech, tail_parts):
+    # Accumulate in the same order as calculate_match_score so float rounding matches
+    score = head.astype(np.float64)
+    score = score + tech
+    for part in tail_parts:
+        score = score + part
+    return np.rint(score).astype(np.int64)
+
+def score_candidates(user_profile, columns, today=None):
+    """Vectorized calculate_match_score over every candidate in columns"""
+    if len(columns) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    search = location_search(user_profile)
+    distances = columns.distances_within(*search) if search else None
+    head, _, tail_parts = _cheap_components(user_profile, columns, search, distances, today)
+    tech = _tech_points(tech_mask(user_profile), columns, np.arange(len(columns)))
+    return _final_scores(head, tech, tail_parts)
+
+def score_as_candidate(candidate_profile, columns, today=None):
+    """Vectorized calculate_match_score(user, candidate_profile) for every
+    user in columns
+
+    Returns (scores, within_radius); within_radius is False where the user
+    has a locationRadius that the candidate's location falls outside.
+    """
+    n = len(columns)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool)
+
+    prefs = columns.preferences()
+    candidate = ProfileFeatures.load(candidate_profile)
+
+    # Age compatibility (20 points)
+    age = candidate.age(today)
+    age_points = np.where((prefs.age_min <= age) & (age <= prefs.age_max), 20, 0)
+
+    # Religion/Community match (15 points)
+    religion_ok = prefs.any_religion.copy()
+    religion_ok[prefs.religion_rows[prefs.religion_codes == candidate.religion]] = True
+    religion_points = np.where(religion_ok, 15, 0)
+
+    # Tech stack overlap (25 points)
+    candidate_tech = candidate.tech_mask
+    if candidate_tech:
+        candidate_words = _tech_words([candidate_tech & ((1 << columns.n_words * 64) - 1)], columns.n_words)
+        overlap = _popcount(columns.tech & candidate_words)
+        ratio = np.divide(overlap, prefs.tech_bits, out=np.zeros(n), where=columns.has_tech)
+        tech = np.where(columns.has_tech, np.minimum(25, ratio * 25), 0.0)
+    else:
+        tech = np.zeros(n, dtype=np.float64)
+
+    # Experience level compatibility (15 points)
+    exp_diff = np.abs(columns.experience - candidate.experience)
+    exp_points = np.where(exp_diff <= 2, 15, np.where(exp_diff <= 5, 10, 0))
+
+    # Location proximity (15 points)
+    same_city = columns.city == candidate.city
+    same_state = columns.state == candidate.state
+    location_points = np.where(same_city, 15, np.where(same_state, 10, 0))
+    within_radius = np.ones(n, dtype=bool)
+    if candidate.has_location:
+        distances = haversine_km(columns.lat, columns.lng, [candidate.lat], [candidate.lng])
+        radius = np.where(prefs.has_search, prefs.radius, 1.0)
+        scaled = proximity_points(np.where(prefs.has_search, distances, np.inf), radius)
+        location_points = np.where(prefs.has_search, scaled, location_points)
+        within_radius = ~(prefs.has_search & (distances > prefs.radius))
+
+    # Work type match (10 points)
+    work_points = np.where(prefs.any_work | (prefs.work_type == candidate.work_type), 10, 0)
+
+    scores = _final_scores(age_points + religion_points, tech, (exp_points, location_points, work_points))
+    return scores, within_radius
+
+class PruneStats:
+    """Running counts of how many candidates rank_candidates skipped scoring"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.considered = 0
+            self.pruned_threshold = 0
+            self.pruned_top_k = 0
+
+    def record(self, considered, pruned_threshold, pruned_top_k):
+        with self._lock:
+            self.considered += considered
+            self.pruned_threshold += pruned_threshold
+            self.pruned_top_k += pruned_top_k
+
+    def snapshot(self):
+        with self._lock:
+            pruned = self.pruned_threshold + self.pruned_top_k
+            return {
+                'considered': self.considered,
+                'prunedThreshold': self.pruned_threshold,
+                'prunedTopK': self.pruned_top_k,
+                'pruneRate': pruned / self.considered if self.considered else 0.0
+            }
+
+prune_stats = PruneStats()
+
+def rank_candidates(user_profile, columns, k=None, min_score=40, exclude_id=None, today=None):
+    """Return (row, score) pairs best first, ties in column order
+
+    Gives the same result as sorting score_candidates, but the integer
+    components are scored first and the tech overlap only for rows whose
+    upper bound (integer points + 25) can still reach min_score and, when k
+    is set, can still beat the k-th best lower bound (integer points alone).
+    Located candidates outside the user's locationRadius are left out.
+    """
+    n = len(columns)
+    if n == 0 or (k is not None and k <= 0):
+        return []
+
+    search = location_search(user_profile)
+    distances = columns.distances_within(*search) if search else None
+    head, rest, tail_parts = _cheap_components(user_profile, columns, search, distances, today)
+    lower = head + rest  # Every component except tech, all integers
+    user_tech = tech_mask(user_profile)
+    upper = lower + np.where(columns.has_tech, 25, 0) if user_tech else lower
+
+    alive = upper >= min_score
+    if search is not None:
+        # Radius filter: located candidates must fall inside the radius
+        alive &= ~(distances > search[2])
+    if exclude_id is not None:
+        for row, candidate_id in enumerate(columns.ids):
+            if candidate_id == exclude_id:
+                alive[row] = False
+    pruned_threshold = n - int(alive.sum())
+
+    pruned_top_k = 0
+    if k is not None and alive.sum() > k:
+        # The k-th best final score is at least the k-th best lower bound
+        kth_lower = np.partition(lower[alive], -k)[-k]
+        survivors = alive & (upper >= kth_lower)
+        pruned_top_k = int(alive.sum() - survivors.sum())
+        alive = survivors
+
+    rows = np.flatnonzero(alive)
+    scores = _final_scores(
+        head[rows],
+        _tech_points(user_tech, columns, rows),
+        [part[rows] for part in tail_parts]
+    )
+    keep = scores >= min_score
+    rows, scores = rows[keep], scores[keep]
+
+    # rows are ascending, so a stable sort on -score keeps ties in column order
+    order = np.argsort(-scores, kind='stable')
+    if k is not None:
+        order = order[:k]
+
+    prune_stats.record(n, pruned_threshold, pruned_top_k)
+    return [(int(rows[i]), int(scores[i])) for i in order]
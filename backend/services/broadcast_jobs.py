@@ -0,0 +1,211 @@
+import queue
+import threading
+from datetime import datetime, timedelta
+from firebase_admin import firestore
+from config import Config
+from services.stats_service import count_query
+
+BROADCAST_FILTERS = ('all', 'premium', 'verified')
+MAX_WRITE_ATTEMPTS = 10
+
+def broadcast_query(db, user_filter):
+    """Users a broadcast with the given filter goes to"""
+    query = db.collection('users')
+    if user_filter == 'premium':
+        query = query.where('isPremium', '==', True)
+    elif user_filter == 'verified':
+        query = query.where('verification.profileVerified', '==', True)
+    return query
+
+class BroadcastRunner:
+    """Background runner for admin broadcasts
+
+    Each job lives in broadcast_jobs/{jobId}. Recipients are read a page of
+    IDs at a time, in document ID order, and their notifications go through
+    a BulkWriter. After every page the job records its progress and the
+    last user ID reached, so an interrupted job resumes from there.
+    Notification IDs are derived from the job and the user, so a page that
+    gets written twice still leaves one notification per user.
+
+    A running job holds a lease that it renews after every page. Only a
+    failed job, or one whose lease has lapsed because its process died,
+    can be resumed.
+    """
+
+    def __init__(self, db, page_size=None, lease_seconds=None):
+        self._db = db
+        self.page_size = page_size or Config.BROADCAST_PAGE_SIZE
+        self.lease = timedelta(seconds=lease_seconds or Config.BROADCAST_LEASE_SECONDS)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='broadcast-runner', daemon=True)
+                self._thread.start()
+        return self
+
+    def _jobs(self):
+        return self._db.collection('broadcast_jobs')
+
+    def submit(self, title, message, user_filter, created_by):
+        """Create a job and queue it; returns the job ID"""
+        now = datetime.utcnow()
+        job_ref = self._jobs().document()
+        job_ref.set({
+            'title': title,
+            'message': message,
+            'filter': user_filter,
+            'status': 'queued',
+            'createdBy': created_by,
+            'createdAt': now,
+            'leaseExpiresAt': now + self.lease,
+            'total': None,
+            'processed': 0,
+            'failed': 0,
+            'cursor': None
+        })
+        self._queue.put(job_ref.id)
+        return job_ref.id
+
+    def resume(self, job_id):
+        """Queue a stopped job to continue from its cursor
+
+        Raises LookupError if there is no such job and ValueError if it
+        is still running or already finished.
+        """
+        job_doc = self._jobs().document(job_id).get()
+        if not job_doc.exists:
+            raise LookupError('Job not found')
+
+        job = job_doc.to_dict()
+        lease_expires = job.get('leaseExpiresAt')
+        stalled = job['status'] in ('queued', 'running') and \
+            (lease_expires is None or lease_expires.replace(tzinfo=None) < datetime.utcnow())
+        if job['status'] != 'failed' and not stalled:
+            raise ValueError(f"Job is {job['status']}")
+
+        self._jobs().document(job_id).update({
+            'status': 'queued',
+            'leaseExpiresAt': datetime.utcnow() + self.lease,
+            'error': None
+        })
+        self._queue.put(job_id)
+
+    def _run(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                self.run_job(job_id)
+            except Exception as e:
+                print(f"Error running broadcast {job_id}: {str(e)}")
+                try:
+                    self._jobs().document(job_id).update({
+                        'status': 'failed',
+                        'error': str(e),
+                        'updatedAt': datetime.utcnow()
+                    })
+                except Exception as e:
+                    print(f"Error marking broadcast {job_id} failed: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def run_job(self, job_id):
+        """Send a job's notifications from its cursor to the end"""
+        job_ref = self._jobs().document(job_id)
+        job = job_ref.get().to_dict()
+        query = broadcast_query(self._db, job['filter'])
+
+        now = datetime.utcnow()
+        started = {
+            'status': 'running',
+            'leaseExpiresAt': now + self.lease,
+            'updatedAt': now
+        }
+        if not job.get('startedAt'):
+            started['startedAt'] = now
+        if job.get('total') is None:
+            started['total'] = count_query(query)
+        job_ref.update(started)
+
+        processed = job.get('processed') or 0
+        cursor = job.get('cursor')
+        failures = []
+
+        def on_write_error(error, bulk_writer):
+            if error.attempts < MAX_WRITE_ATTEMPTS:
+                return True
+            failures.append(error)
+            return False
+
+        notifications = self._db.collection('notifications')
+        writer = self._db.bulk_writer()
+        writer.on_write_error(on_write_error)
+        try:
+            while True:
+                page = query.order_by(firestore.FieldPath.document_id()).select([])
+                if cursor:
+                    page = page.start_after({'__name__': self._db.collection('users').document(cursor)})
+                user_ids = [doc.id for doc in page.limit(self.page_size).stream()]
+                if not user_ids:
+                    break
+
+                created_at = datetime.utcnow()
+                for user_id in user_ids:
+                    writer.set(notifications.document(f'{job_id}_{user_id}'), {
+                        'userId': user_id,
+                        'type': 'broadcast',
+                        'title': job['title'],
+                        'message': job['message'],
+                        'broadcastId': job_id,
+                        'read': False,
+                        'createdAt': created_at
+                    })
+                writer.flush()
+
+                # Checkpoint once the page is written
+                processed += len(user_ids)
+                cursor = user_ids[-1]
+                now = datetime.utcnow()
+                job_ref.update({
+                    'processed': processed,
+                    'failed': (job.get('failed') or 0) + len(failures),
+                    'cursor': cursor,
+                    'leaseExpiresAt': now + self.lease,
+                    'updatedAt': now
+                })
+                if len(user_ids) < self.page_size:
+                    break
+        finally:
+            writer.close()
+
+        now = datetime.utcnow()
+        job_ref.update({
+            'status': 'completed',
+            'failed': (job.get('failed') or 0) + len(failures),
+            'finishedAt': now,
+            'updatedAt': now
+        })
+
+def job_status(db, job_id):
+    """The job document with its ID, or None if there is no such job"""
+    job_doc = db.collection('broadcast_jobs').document(job_id).get()
+    if not job_doc.exists:
+        return None
+    job = job_doc.to_dict()
+    job['id'] = job_doc.id
+    return job
+
+_runner = None
+_runner_lock = threading.Lock()
+
+def get_broadcast_runner():
+    """Return the process-wide broadcast runner, starting its worker on first use"""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            from app import db
+            _runner = BroadcastRunner(db).start()
+        return _runner
@@ -0,0 +1,257 @@
+import bisect
+import math
+import threading
+import time
+from collections import defaultdict
+from services.batch_scoring import CandidateColumns
+from services.profile_features import ProfileFeatures
+
+INDEXED_FIELDS = ('gender', 'isActive', 'religion', 'state', 'city', 'workType')
+RESUBSCRIBE_INTERVAL = 30  # seconds between attempts to replace a dead listener
+
+def _indexed_values(profile):
+    """Pull the indexed fields out of a profile document"""
+    return {
+        'gender': profile.get('gender'),
+        'isActive': profile.get('isActive'),
+        'religion': profile.get('religion'),
+        'state': profile.get('state'),
+        'city': profile.get('city'),
+        'workType': (profile.get('developerInfo') or {}).get('workType')
+    }
+
+def _matching_inputs(features):
+    """Everything the cached columns take from a profile's features
+
+    Missing coordinates are NaN, which never equals itself, so they are
+    compared as None.
+    """
+    values = (getattr(features, slot) for slot in ProfileFeatures.__slots__)
+    return tuple(None if isinstance(value, float) and math.isnan(value) else value for value in values)
+
+class CandidateIndex:
+    """Per-process index of user profiles kept current by an on_snapshot listener
+
+    The first snapshot loads every user once; later snapshots only carry the
+    changed documents. Any client with Firestore's collection/on_snapshot
+    interface can be passed in, which keeps the index usable with a local
+    stand-in for the real client.
+
+    A document that fails to index is dropped rather than left stale. If
+    the listener itself stops, the next wait_ready() throws the index away
+    and subscribes again; callers see it as not ready until the fresh
+    initial snapshot is in.
+    """
+
+    def __init__(self, db, collection='users'):
+        self._db = db
+        self._collection = collection
+        self._lock = threading.RLock()
+        self._ready = threading.Event()
+        self._watch = None
+        self._subscribed_at = 0
+        self._subscribers = []
+        self._clear()
+
+    def _clear(self):
+        self._profiles = {}
+        self._features = {}
+        self._keys = {}
+        self._buckets = {field: defaultdict(set) for field in INDEXED_FIELDS}
+        self._columns = {}
+
+    def start(self):
+        """Attach the listener; safe to call more than once"""
+        with self._lock:
+            if self._watch is None:
+                self._subscribed_at = time.monotonic()
+                self._watch = self._db.collection(self._collection).on_snapshot(self._on_snapshot)
+        return self
+
+    def stop(self):
+        with self._lock:
+            if self._watch is not None:
+                self._watch.unsubscribe()
+                self._watch = None
+            self._ready.clear()
+
+    def wait_ready(self, timeout=None):
+        """Block until the initial snapshot has been applied
+
+        Returns False straight away when there is no live listener to
+        wait for.
+        """
+        if not self._ensure_listening():
+            return False
+        return self._ready.wait(timeout)
+
+    def _ensure_listening(self):
+        """Resubscribe if the listener has stopped; False while none is live"""
+        with self._lock:
+            if self._watch is None:
+                return False
+            # Real watches report is_active; stand-ins that lack it never stop
+            if getattr(self._watch, 'is_active', True):
+                return True
+            if time.monotonic() - self._subscribed_at < RESUBSCRIBE_INTERVAL:
+                return False
+
+            print("Candidate index listener stopped, subscribing again")
+            try:
+                self._watch.unsubscribe()
+            except Exception as e:
+                print(f"Error closing candidate index listener: {str(e)}")
+            self._watch = None
+            self._ready.clear()
+            self._clear()
+            try:
+                self.start()
+            except Exception as e:
+                print(f"Error subscribing candidate index: {str(e)}")
+                return False
+            return True
+
+    def subscribe(self, callback):
+        """Call callback(user_ids) with the IDs touched by every later snapshot"""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def _on_snapshot(self, col_snapshot, changes, read_time):
+        # An exception escaping here would end the listener, so every
+        # document and subscriber is guarded on its own
+        with self._lock:
+            for change in changes:
+                doc = change.document
+                try:
+                    if change.type.name == 'REMOVED':
+                        self._remove(doc.id)
+                    else:
+                        self._upsert(doc.id, doc.to_dict())
+                except Exception as e:
+                    print(f"Error indexing profile {doc.id}: {str(e)}")
+                    self._drop(doc.id)
+            subscribers = list(self._subscribers)
+        self._ready.set()
+
+        changed_ids = [change.document.id for change in changes]
+        for callback in subscribers:
+            try:
+                callback(changed_ids)
+            except Exception as e:
+                print(f"Error notifying candidate index subscriber: {str(e)}")
+
+    def _drop(self, user_id):
+        # Out of the index entirely, so a half-applied change is never served
+        try:
+            self._remove(user_id)
+        except Exception:
+            self._keys.pop(user_id, None)
+            self._profiles.pop(user_id, None)
+            self._features.pop(user_id, None)
+            for buckets in self._buckets.values():
+                for bucket in buckets.values():
+                    bucket.discard(user_id)
+            self._columns.clear()
+
+    def _upsert(self, user_id, profile):
+        keys = _indexed_values(profile)
+        features = ProfileFeatures.load(profile)
+        if self._keys.get(user_id) == keys and \
+                _matching_inputs(self._features[user_id]) == _matching_inputs(features) and \
+                self._profiles[user_id].get('preferences') == profile.get('preferences'):
+            # Only fields outside matching changed (photos, tokens, flags);
+            # swap the profile into the cached columns instead of rebuilding
+            self._profiles[user_id] = profile
+            self._features[user_id] = features
+            self._patch_columns(user_id, keys['gender'], profile)
+            return
+
+        self._remove(user_id)
+        self._profiles[user_id] = profile
+        self._features[user_id] = features
+        self._keys[user_id] = keys
+        for field, value in keys.items():
+            try:
+                self._buckets[field][value].add(user_id)
+            except TypeError:
+                pass  # Unhashable values are not indexable
+        self._invalidate(keys)
+
+    def _remove(self, user_id):
+        keys = self._keys.pop(user_id, None)
+        self._profiles.pop(user_id, None)
+        self._features.pop(user_id, None)
+        if keys is None:
+            return
+        for field, value in keys.items():
+            try:
+                bucket = self._buckets[field].get(value)
+            except TypeError:
+                continue
+            if bucket is not None:
+                bucket.discard(user_id)
+                if not bucket:
+                    del self._buckets[field][value]
+        self._invalidate(keys)
+
+    def _patch_columns(self, user_id, gender, profile):
+        try:
+            columns = self._columns.get(gender)
+        except TypeError:
+            return
+        if columns is None:
+            return
+        row = bisect.bisect_left(columns.ids, user_id)
+        if row < len(columns.ids) and columns.ids[row] == user_id:
+            columns.profiles[row] = profile
+
+    def _invalidate(self, keys):
+        try:
+            self._columns.pop(keys['gender'], None)
+        except TypeError:
+            pass
+
+    def __len__(self):
+        return len(self._profiles)
+
+    def get(self, user_id):
+        """Return the indexed profile for user_id, or None"""
+        return self._profiles.get(user_id)
+
+    def find(self, **filters):
+        """Return sorted IDs of users whose indexed fields equal every filter"""
+        with self._lock:
+            result = None
+            for field, value in filters.items():
+                bucket = self._buckets[field].get(value, set())
+                result = set(bucket) if result is None else result & bucket
+                if not result:
+                    return []
+            if result is None:
+                result = self._profiles.keys()
+            return sorted(result)
+
+    def active_columns(self, gender):
+        """CandidateColumns for active users of a gender, rebuilt only after changes"""
+        with self._lock:
+            columns = self._columns.get(gender)
+            if columns is None:
+                ids = self.find(gender=gender, isActive=True)
+                columns = CandidateColumns(
+                    [(user_id, self._profiles[user_id]) for user_id in ids],
+                    [self._features[user_id] for user_id in ids]
+                )
+                self._columns[gender] = columns
+            return columns
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_candidate_index():
+    """Return the process-wide index, starting its listener on first use"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            from app import db
+            _index = CandidateIndex(db).start()
+        return _index
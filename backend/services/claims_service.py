@@ -0,0 +1,49 @@
+import calendar
+import time
+from firebase_admin import auth
+
+# Entitlements mirrored from users/{uid} into Firebase custom claims, so the
+# middleware can authorize from the ID token without reading the profile.
+# Claims reach clients on their next token refresh (at most an hour).
+ENTITLEMENT_CLAIMS = ('admin', 'premium', 'premiumPlan', 'premiumExpiresAt', 'verified')
+
+def to_epoch(value):
+    """Seconds since the epoch for a UTC datetime, as stored in claims"""
+    return calendar.timegm(value.utctimetuple()) if value else None
+
+def claims_from_profile(profile):
+    """Entitlement claims implied by a users/{uid} document
+
+    Leaves out `admin`: that claim is only written when admin access is
+    granted or revoked, so a profile write cannot clobber it.
+    """
+    is_premium = bool(profile.get('isPremium', False))
+    return {
+        'premium': is_premium,
+        'premiumPlan': profile.get('premiumPlan') if is_premium else None,
+        'premiumExpiresAt': to_epoch(profile.get('premiumExpiresAt')) if is_premium else None,
+        'verified': bool((profile.get('verification') or {}).get('profileVerified', False))
+    }
+
+def update_claims(user_id, **changes):
+    """Merge entitlement changes into the user's custom claims
+
+    Other claims on the account are kept. Returns False instead of raising,
+    since the Firestore document stays the source of truth and the
+    middleware falls back to it.
+    """
+    try:
+        claims = dict(auth.get_user(user_id).custom_claims or {})
+        claims.update(changes)
+        auth.set_custom_user_claims(user_id, {k: v for k, v in claims.items() if v is not None})
+        return True
+    except Exception as e:
+        print(f'Error updating claims for {user_id}: {str(e)}')
+        return False
+
+def premium_from_claims(decoded_token):
+    """Whether the token grants an unexpired premium subscription"""
+    if not decoded_token.get('premium'):
+        return False
+    expires_at = decoded_token.get('premiumExpiresAt')
+    return expires_at is None or expires_at > time.time()
@@ -0,0 +1,81 @@
+import hashlib
+from datetime import datetime
+from firebase_admin import firestore
+from app import db
+
+def conversation_id(user1_id, user2_id):
+    """Document ID of the conversation between two users, the same in either order
+
+    Hashing the sorted pair keeps IDs unambiguous whatever characters the
+    user IDs contain.
+    """
+    first, second = sorted([user1_id, user2_id])
+    return hashlib.sha1(f'{first}\n{second}'.encode('utf-8')).hexdigest()
+
+def conversation_ref(user1_id, user2_id):
+    return db.collection('conversations').document(conversation_id(user1_id, user2_id))
+
+def with_conversation(user_id, other_ids):
+    """The users among other_ids who have a conversation with user_id
+
+    One batched read of the pairs' conversation documents.
+    """
+    by_conversation = {
+        conversation_id(user_id, other_id): other_id
+        for other_id in other_ids if other_id != user_id
+    }
+    if not by_conversation:
+        return set()
+    refs = [db.collection('conversations').document(conv_id) for conv_id in by_conversation]
+    return {
+        by_conversation[snapshot.id]
+        for snapshot in db.get_all(refs, field_paths=['participants'])
+        if snapshot.exists
+    }
+
+def new_conversation(user1_id, user2_id, now=None):
+    """Initial document for a conversation between two users"""
+    now = now or datetime.utcnow()
+    return {
+        'participants': sorted([user1_id, user2_id]),
+        'createdAt': now,
+        'lastMessage': '',
+        'lastMessageAt': now,
+        'unreadCount': {user1_id: 0, user2_id: 0}
+    }
+
+@firestore.transactional
+def _create_if_missing(transaction, conv_ref, user1_id, user2_id):
+    if not conv_ref.get(transaction=transaction).exists:
+        transaction.set(conv_ref, new_conversation(user1_id, user2_id))
+
+@firestore.transactional
+def _clear_unread(transaction, conv_ref, user_id, read_through):
+    snapshot = conv_ref.get(field_paths=['lastMessageAt'], transaction=transaction)
+    if not snapshot.exists:
+        return False
+    last_message_at = (snapshot.to_dict() or {}).get('lastMessageAt')
+    if last_message_at is not None and \
+            last_message_at.replace(tzinfo=None) > read_through.replace(tzinfo=None):
+        return False
+    transaction.update(conv_ref, {f'unreadCount.{user_id}': 0})
+    return True
+
+def clear_unread_through(conv_ref, user_id, read_through):
+    """Zero user_id's unread count, unless a message arrived after read_through
+
+    For read marks written some time after the read they stand for: the
+    count is left alone, rather than covering messages the user never
+    fetched. Returns whether it was cleared.
+    """
+    return _clear_unread(db.transaction(), conv_ref, user_id, read_through)
+
+def get_or_create_conversation(user1_id, user2_id):
+    """Reference to the pair's conversation, created if it does not exist yet
+
+    Creation runs in a transaction, so two first messages sent at the same
+    time still end up in one conversation.
+    """
+    conv_ref = conversation_ref(user1_id, user2_id)
+    _create_if_missing(db.transaction(), conv_ref, user1_id, user2_id)
+    return conv_ref
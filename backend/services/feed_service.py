@@ -0,0 +1,173 @@
+import queue
+import threading
+import numpy as np
+from datetime import datetime, timedelta
+from config import Config
+from services.candidate_index import get_candidate_index
+from services.batch_scoring import score_as_candidate
+from services.matching_service import rank_from_index
+from services.seen_pairs import get_seen_pairs
+from services.profile_views import match_card
+
+class FeedBuilder:
+    """Background builder for precomputed per-user match feeds
+
+    Each feed lives in match_feeds/{userId} and holds the owner's top-N
+    matches. Only feeds affected by a profile change are rebuilt: the
+    owner's own feed, feeds that already list the changed user, and feeds
+    the user's new score would now enter.
+    """
+
+    def __init__(self, db, feed_size=None, ttl_seconds=None):
+        self._db = db
+        self.feed_size = feed_size or Config.MATCH_FEED_SIZE
+        self.ttl = timedelta(seconds=ttl_seconds or Config.MATCH_FEED_TTL)
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._floors = {}  # owner id -> lowest score in their last built feed
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='feed-builder', daemon=True)
+                self._thread.start()
+        return self
+
+    def _feeds(self):
+        return self._db.collection('match_feeds')
+
+    def request_rebuild(self, user_id, mark_stale=True):
+        """Queue a feed for rebuilding
+
+        With mark_stale the stored feed stops being served right away; pass
+        False when the caller already found it stale, missing or only short.
+        """
+        with self._lock:
+            if user_id in self._pending:
+                return
+            self._pending.add(user_id)
+        if mark_stale:
+            try:
+                self._feeds().document(user_id).set({'stale': True}, merge=True)
+            except Exception as e:
+                print(f"Error marking feed stale: {str(e)}")
+        self._queue.put(('rebuild', user_id, None))
+
+    def profile_changed(self, user_id, profile=None):
+        """Queue the feeds affected by a create, preference or isActive change
+
+        Pass the profile just written when there is one; the index may not
+        have received it from the listener yet.
+        """
+        self._queue.put(('changed', user_id, profile))
+
+    def _run(self):
+        while True:
+            action, user_id, profile = self._queue.get()
+            try:
+                if action == 'rebuild':
+                    with self._lock:
+                        self._pending.discard(user_id)
+                    self.build_feed(user_id)
+                else:
+                    self._fan_out(user_id, profile)
+            except Exception as e:
+                print(f"Error building match feed: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def build_feed(self, user_id):
+        """Score and store the top-N matches for one user
+
+        Errors, and an index that is not ready yet, leave the feed stale so
+        discover keeps ranking live; nothing partial is stored.
+        """
+        ranking = rank_from_index(user_id, self.feed_size)
+        if ranking is None:
+            return []
+        matches = [{'userId': candidate_id, 'matchScore': score} for score, candidate_id, _ in ranking]
+        self._feeds().document(user_id).set({
+            'matches': matches,
+            'memberIds': [match['userId'] for match in matches],
+            'builtAt': datetime.utcnow(),
+            'stale': False
+        })
+        self._floors[user_id] = matches[-1]['matchScore'] if len(matches) >= self.feed_size else 40
+        return matches
+
+    def _fan_out(self, user_id, profile=None):
+        self.request_rebuild(user_id)
+
+        # Feeds that currently list this user
+        containing = self._feeds().where('memberIds', 'array_contains', user_id).stream()
+        for feed in containing:
+            self.request_rebuild(feed.id)
+
+        # Feeds this user's score would now enter
+        index = get_candidate_index()
+        profile = profile or index.get(user_id)
+        if not profile or not profile.get('isActive'):
+            return
+
+        # Feeds unknown to this process expire through the TTL
+        floors = dict(self._floors)
+        if not floors:
+            return
+        opposite_gender = 'Female' if profile.get('gender') == 'Male' else 'Male'
+        owners = index.active_columns(opposite_gender)
+        scores, within_radius = score_as_candidate(profile, owners)
+        for row in np.flatnonzero(within_radius):
+            owner_id = owners.ids[row]
+            floor = floors.get(owner_id)
+            if floor is not None and owner_id != user_id and scores[row] >= floor:
+                self.request_rebuild(owner_id)
+
+    def read_feed(self, user_id):
+        """Return the stored feed entries, or None while the feed is stale"""
+        feed_doc = self._feeds().document(user_id).get()
+        if not feed_doc.exists:
+            return None
+
+        feed = feed_doc.to_dict()
+        built_at = feed.get('builtAt')
+        if feed.get('stale') or not built_at:
+            return None
+        if datetime.utcnow() - built_at.replace(tzinfo=None) > self.ttl:
+            return None
+
+        return feed.get('matches', [])
+
+def expand_feed(user_id, feed, limit):
+    """Turn feed entries into match cards from in-memory profiles, dropping
+    users gone inactive or already requested or answered"""
+    index = get_candidate_index()
+    if not index.wait_ready(0):
+        return None
+
+    seen = get_seen_pairs().for_user(user_id)
+    today = datetime.today()
+    matches = []
+    for entry in feed:
+        if entry['userId'] in seen:
+            continue
+        profile = index.get(entry['userId'])
+        if not profile or not profile.get('isActive'):
+            continue
+        matches.append(match_card(user_id, entry['userId'], profile, entry['matchScore'], today))
+        if len(matches) == limit:
+            break
+    return matches
+
+_builder = None
+_builder_lock = threading.Lock()
+
+def get_feed_builder():
+    """Return the process-wide feed builder, starting its worker on first use"""
+    global _builder
+    with _builder_lock:
+        if _builder is None:
+            from app import db
+            _builder = FeedBuilder(db).start()
+        return _builder
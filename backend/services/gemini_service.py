@@ -1,5 +1,6 @@
 import google.generativeai as genai
 from config import Config
+from services.tech_vocabulary import get_tech_vocabulary, tech_mask
 
 genai.configure(api_key=Config.GEMINI_API_KEY)
 
@@ -52,8 +53,8 @@ class GeminiChatbot:
     def suggest_icebreaker(self, user_profile, match_profile):
         """Generate personalized ice-breaker message"""
         try:
-            common_tech = set(user_profile.get('developerInfo', {}).get('techStack', [])) & \
-                         set(match_profile.get('developerInfo', {}).get('techStack', []))
+            vocabulary = get_tech_vocabulary()
+            common_tech = vocabulary.terms(tech_mask(user_profile) & tech_mask(match_profile))
             
             prompt = f"""
             Generate a friendly, professional ice-breaker message for a developer matrimony match.
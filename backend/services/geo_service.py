@@ -0,0 +1,194 @@
+import math
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+
+# Offline city table (approximate city-centre coordinates), so profiles can
+# be geocoded without calling an external service
+CITY_COORDINATES = {
+    # Tamil Nadu & Puducherry
+    'chennai': (13.0827, 80.2707),
+    'coimbatore': (11.0168, 76.9558),
+    'madurai': (9.9252, 78.1198),
+    'tiruchirappalli': (10.7905, 78.7047),
+    'salem': (11.6643, 78.1460),
+    'tirunelveli': (8.7139, 77.7567),
+    'erode': (11.3410, 77.7172),
+    'vellore': (12.9165, 79.1325),
+    'thoothukudi': (8.7642, 78.1348),
+    'thanjavur': (10.7870, 79.1378),
+    'tiruppur': (11.1085, 77.3411),
+    'dindigul': (10.3673, 77.9803),
+    'kanchipuram': (12.8342, 79.7036),
+    'nagercoil': (8.1833, 77.4119),
+    'hosur': (12.7409, 77.8253),
+    'karur': (10.9601, 78.0766),
+    'cuddalore': (11.7480, 79.7714),
+    'kumbakonam': (10.9617, 79.3881),
+    'puducherry': (11.9416, 79.8083),
+    # South
+    'bengaluru': (12.9716, 77.5946),
+    'mysuru': (12.2958, 76.6394),
+    'mangaluru': (12.9141, 74.8560),
+    'hubballi': (15.3647, 75.1240),
+    'hyderabad': (17.3850, 78.4867),
+    'secunderabad': (17.4399, 78.4983),
+    'visakhapatnam': (17.6868, 83.2185),
+    'vijayawada': (16.5062, 80.6480),
+    'tirupati': (13.6288, 79.4192),
+    'warangal': (17.9689, 79.5941),
+    'kochi': (9.9312, 76.2673),
+    'thiruvananthapuram': (8.5241, 76.9366),
+    'kozhikode': (11.2588, 75.7804),
+    'thrissur': (10.5276, 76.2144),
+    'panaji': (15.4909, 73.8278),
+    # West
+    'mumbai': (19.0760, 72.8777),
+    'navi mumbai': (19.0330, 73.0297),
+    'thane': (19.2183, 72.9781),
+    'pune': (18.5204, 73.8567),
+    'nagpur': (21.1458, 79.0882),
+    'nashik': (19.9975, 73.7898),
+    'ahmedabad': (23.0225, 72.5714),
+    'gandhinagar': (23.2156, 72.6369),
+    'surat': (21.1702, 72.8311),
+    'vadodara': (22.3072, 73.1812),
+    'rajkot': (22.3039, 70.8022),
+    # North
+    'delhi': (28.7041, 77.1025),
+    'new delhi': (28.6139, 77.2090),
+    'gurugram': (28.4595, 77.0266),
+    'noida': (28.5355, 77.3910),
+    'ghaziabad': (28.6692, 77.4538),
+    'faridabad': (28.4089, 77.3178),
+    'chandigarh': (30.7333, 76.7794),
+    'ludhiana': (30.9010, 75.8573),
+    'amritsar': (31.6340, 74.8723),
+    'dehradun': (30.3165, 78.0322),
+    'srinagar': (34.0837, 74.7973),
+    'jaipur': (26.9124, 75.7873),
+    'jodhpur': (26.2389, 73.0243),
+    'udaipur': (24.5854, 73.7125),
+    'lucknow': (26.8467, 80.9462),
+    'kanpur': (26.4499, 80.3319),
+    'agra': (27.1767, 78.0081),
+    'varanasi': (25.3176, 82.9739),
+    'prayagraj': (25.4358, 81.8463),
+    # Central & East
+    'bhopal': (23.2599, 77.4126),
+    'indore': (22.7196, 75.8577),
+    'raipur': (21.2514, 81.6296),
+    'kolkata': (22.5726, 88.3639),
+    'bhubaneswar': (20.2961, 85.8245),
+    'patna': (25.5941, 85.1376),
+    'ranchi': (23.3441, 85.3096),
+    'guwahati': (26.1445, 91.7362),
+}
+
+CITY_ALIASES = {
+    'madras': 'chennai',
+    'trichy': 'tiruchirappalli',
+    'tuticorin': 'thoothukudi',
+    'tanjore': 'thanjavur',
+    'pondicherry': 'puducherry',
+    'bangalore': 'bengaluru',
+    'mysore': 'mysuru',
+    'mangalore': 'mangaluru',
+    'hubli': 'hubballi',
+    'vizag': 'visakhapatnam',
+    'cochin': 'kochi',
+    'trivandrum': 'thiruvananthapuram',
+    'calicut': 'kozhikode',
+    'bombay': 'mumbai',
+    'gurgaon': 'gurugram',
+    'allahabad': 'prayagraj',
+    'calcutta': 'kolkata',
+    'goa': 'panaji',
+}
+
+def geocode_city(city):
+    """Return (lat, lng) for a known city name, else None"""
+    if not isinstance(city, str):
+        return None
+    name = ' '.join(city.lower().split())
+    return CITY_COORDINATES.get(CITY_ALIASES.get(name, name))
+
+def encode_geohash(lat, lng, precision=GEOHASH_PRECISION):
+    """Standard base32 geohash of a point"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        rng, coord = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_BASE32[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+def _cell_size_deg(precision):
+    """(lat, lng) size in degrees of a geohash cell at this precision"""
+    total_bits = precision * 5
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+def covering_prefixes(lat, lng, radius_km):
+    """Geohash prefixes whose cells together cover a circle around (lat, lng)
+
+    Picks the finest precision whose cells are at least radius_km on each
+    side, so the centre cell plus its eight neighbours contain the circle.
+    """
+    precision = 1
+    for candidate in range(GEOHASH_PRECISION, 0, -1):
+        lat_deg, lng_deg = _cell_size_deg(candidate)
+        height_km = math.radians(lat_deg) * EARTH_RADIUS_KM
+        width_km = math.radians(lng_deg) * EARTH_RADIUS_KM * math.cos(math.radians(min(abs(lat) + lat_deg, 90)))
+        if height_km >= radius_km and width_km >= radius_km:
+            precision = candidate
+            break
+
+    lat_deg, lng_deg = _cell_size_deg(precision)
+    prefixes = set()
+    for d_lat in (-1, 0, 1):
+        for d_lng in (-1, 0, 1):
+            cell_lat = max(-90.0, min(90.0 - 1e-9, lat + d_lat * lat_deg))
+            cell_lng = (lng + d_lng * lng_deg + 180.0) % 360.0 - 180.0
+            prefixes.add(encode_geohash(cell_lat, cell_lng, precision))
+    return sorted(prefixes)
+
+def haversine_km(lat, lng, lats, lngs):
+    """Great-circle distances in km from one point to arrays of points"""
+    lat1 = np.radians(lat)
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    d_lat = lats - lat1
+    d_lng = np.radians(np.asarray(lngs, dtype=np.float64) - lng)
+    a = np.sin(d_lat / 2) ** 2 + np.cos(lat1) * np.cos(lats) * np.sin(d_lng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def proximity_points(distances_km, radius_km, max_points=15):
+    """Whole points that fall off linearly from max_points at 0 km to 0 at the radius"""
+    scaled = max_points * (1 - np.asarray(distances_km, dtype=np.float64) / radius_km)
+    return np.clip(np.floor(scaled), 0, max_points).astype(np.int64)
+
+def location_for(city):
+    """Location map stored on a profile, or None when the city is unknown"""
+    coordinates = geocode_city(city)
+    if coordinates is None:
+        return None
+    lat, lng = coordinates
+    return {'lat': lat, 'lng': lng, 'geohash': encode_geohash(lat, lng)}
@@ -1,5 +1,18 @@
+import bisect
 from app import db
 from datetime import datetime
+from config import Config
+from services.batch_scoring import CandidateColumns, location_search, rank_candidates
+from services.geo_service import haversine_km, proximity_points
+from services.profile_features import ProfileFeatures
+from services.candidate_index import get_candidate_index
+from services.tech_vocabulary import tech_mask
+from services.seen_pairs import get_seen_pairs
+from services.profile_cache import get_profile_cache
+from services.profile_views import match_card
+from services.result_cache import ResultCache, decode_cursor, encode_cursor, preferences_hash
+
+_ranking_cache = ResultCache(Config.DISCOVER_CACHE_MAX_BYTES, Config.DISCOVER_CACHE_TTL)
 
 def calculate_match_score(user_profile, candidate_profile):
     """Calculate compatibility score between two profiles"""
@@ -20,12 +33,12 @@ def calculate_match_score(user_profile, candidate_profile):
         score += 15
     
     # Tech stack overlap (25 points)
-    user_tech = set(user_profile.get('developerInfo', {}).get('techStack', []))
-    candidate_tech = set(candidate_profile.get('developerInfo', {}).get('techStack', []))
+    user_tech = tech_mask(user_profile)
+    candidate_tech = tech_mask(candidate_profile)
     
     if user_tech and candidate_tech:
-        overlap = len(user_tech & candidate_tech)
-        tech_score = min(25, (overlap / len(user_tech)) * 25)
+        overlap = (user_tech & candidate_tech).bit_count()
+        tech_score = min(25, (overlap / user_tech.bit_count()) * 25)
         score += tech_score
     
     # Experience level compatibility (15 points)
@@ -39,7 +52,13 @@ def calculate_match_score(user_profile, candidate_profile):
         score += 10
     
     # Location proximity (15 points)
-    if user_profile.get('city') == candidate_profile.get('city'):
+    search = location_search(user_profile)
+    candidate_features = ProfileFeatures.load(candidate_profile) if search else None
+    if search and candidate_features.has_location:
+        lat, lng, radius = search
+        distance = haversine_km(lat, lng, [candidate_features.lat], [candidate_features.lng])
+        score += int(proximity_points(distance, radius)[0])
+    elif user_profile.get('city') == candidate_profile.get('city'):
         score += 15
     elif user_profile.get('state') == candidate_profile.get('state'):
         score += 10
@@ -61,50 +80,129 @@ def calculate_age(dob_string):
     except:
         return 0
 
+def _query_candidates(user_id, gender):
+    """Fallback candidate source used until the in-memory index is ready"""
+    candidates = db.collection('users')\
+        .where('gender', '==', gender)\
+        .where('isActive', '==', True)\
+        .limit(100)\
+        .stream()
+    
+    return CandidateColumns([
+        (candidate_doc.id, candidate_doc.to_dict())
+        for candidate_doc in candidates
+        if candidate_doc.id != user_id  # Skip self
+    ])
+
+def _load_user_profile(user_id, index, index_ready):
+    user_profile = index.get(user_id) if index_ready else None
+    if user_profile is None:
+        user_profile = get_profile_cache().get(user_id)
+    return user_profile
+
+def _rank_matches(user_id, user_profile, index, index_ready, k=None):
+    """Score the candidate pool and return (score, userId, profile) best first"""
+    user_gender = user_profile.get('gender')
+    
+    # Query for opposite gender (or same if preference set)
+    opposite_gender = 'Female' if user_gender == 'Male' else 'Male'
+    
+    # Every active candidate from memory, or the first 100 from Firestore
+    if index_ready:
+        columns = index.active_columns(opposite_gender)
+    else:
+        columns = _query_candidates(user_id, opposite_gender)
+    
+    # Over-fetch by the number of seen candidates, then drop them in memory
+    seen = get_seen_pairs().for_user(user_id)
+    fetch = None if k is None else k + len(seen)
+    
+    # Ties stay in userId order (columns are already in that order)
+    ranked = rank_candidates(user_profile, columns, k=fetch, min_score=40, exclude_id=user_id)
+    ranking = [
+        (score, columns.ids[row], columns.profiles[row])
+        for row, score in ranked
+        if columns.ids[row] not in seen
+    ]
+    return ranking if k is None else ranking[:k]
+
 def find_matches(user_id, limit=20):
-    """Find potential matches for a user"""
+    """Find the top `limit` matches for a user"""
     try:
-        # Get user profile
-        user_doc = db.collection('users').document(user_id).get()
-        if not user_doc.exists:
-            return []
-        
-        user_profile = user_doc.to_dict()
-        user_gender = user_profile.get('gender')
-        
-        # Query for opposite gender (or same if preference set)
-        opposite_gender = 'Female' if user_gender == 'Male' else 'Male'
-        
-        candidates = db.collection('users')\
-            .where('gender', '==', opposite_gender)\
-            .where('isActive', '==', True)\
-            .limit(100)\
-            .stream()
+        index = get_candidate_index()
+        index_ready = index.wait_ready(Config.CANDIDATE_INDEX_TIMEOUT)
         
-        matches = []
-        for candidate_doc in candidates:
-            candidate_id = candidate_doc.id
-            
-            # Skip self
-            if candidate_id == user_id:
-                continue
-            
-            candidate_profile = candidate_doc.to_dict()
-            
-            # Calculate match score
-            score = calculate_match_score(user_profile, candidate_profile)
-            
-            if score >= 40:  # Minimum threshold
-                matches.append({
-                    'userId': candidate_id,
-                    'profile': candidate_profile,
-                    'matchScore': score
-                })
+        user_profile = _load_user_profile(user_id, index, index_ready)
+        if user_profile is None:
+            return []
         
-        # Sort by score and return top matches
-        matches.sort(key=lambda x: x['matchScore'], reverse=True)
-        return matches[:limit]
+        ranking = _rank_matches(user_id, user_profile, index, index_ready, k=limit)
+        today = datetime.today()
+        return [
+            match_card(user_id, candidate_id, profile, score, today)
+            for score, candidate_id, profile in ranking
+        ]
         
     except Exception as e:
         print(f"Error finding matches: {str(e)}")
-        return [] 
+        return []
+
+def rank_from_index(user_id, limit):
+    """Top `limit` matches as (score, userId, profile), from the full index
+    
+    For precomputed feeds, which must not be built from the partial
+    Firestore fallback: raises RuntimeError while the index is not ready,
+    and lets any other error propagate. Returns None if the user has no
+    profile.
+    """
+    index = get_candidate_index()
+    if not index.wait_ready(Config.CANDIDATE_INDEX_TIMEOUT):
+        raise RuntimeError('Candidate index not ready')
+    
+    user_profile = _load_user_profile(user_id, index, True)
+    if user_profile is None:
+        return None
+    return _rank_matches(user_id, user_profile, index, True, k=limit)
+
+def find_match_page(user_id, limit=20, cursor=None):
+    """Return one page of matches and the cursor for the next page
+    
+    The full ranking is cached per user and preferences hash, so later pages
+    are sliced from memory without re-querying or re-scoring.
+    """
+    index = get_candidate_index()
+    index_ready = index.wait_ready(Config.CANDIDATE_INDEX_TIMEOUT)
+    
+    # Get user profile
+    user_profile = _load_user_profile(user_id, index, index_ready)
+    if user_profile is None:
+        return [], None
+    
+    cache_key = (user_id, preferences_hash(user_profile.get('preferences')))
+    ranking = _ranking_cache.get(cache_key)
+    if ranking is None:
+        ranking = _rank_matches(user_id, user_profile, index, index_ready)
+        _ranking_cache.put(cache_key, ranking)
+    
+    start = 0
+    if cursor:
+        after_score, after_id = decode_cursor(cursor)
+        keys = [(-score, candidate_id) for score, candidate_id, _ in ranking]
+        start = bisect.bisect_right(keys, (-after_score, after_id))
+    
+    # Skip anyone requested or answered since the ranking was cached
+    seen = get_seen_pairs().for_user(user_id)
+    today = datetime.today()
+    matches = []
+    position = start
+    while position < len(ranking) and len(matches) < limit:
+        score, candidate_id, profile = ranking[position]
+        position += 1
+        if candidate_id not in seen:
+            matches.append(match_card(user_id, candidate_id, profile, score, today))
+    
+    next_cursor = None
+    if matches and position < len(ranking):
+        next_cursor = encode_cursor(matches[-1]['matchScore'], matches[-1]['userId'])
+    
+    return matches, next_cursor
@@ -0,0 +1,177 @@
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime
+from config import Config
+
+BATCH_LIMIT = 500  # Firestore's cap on writes per batch
+MAX_BACKOFF = 30  # seconds
+
+class NotificationOutbox:
+    """Background writer for notifications/{id} documents and their pushes
+
+    Routes enqueue a notification and move on; a worker thread writes what
+    has queued up in WriteBatch groups, then hands the batch to
+    `send_pushes`. That returns the notifications it could not send yet,
+    and only those are tried again, so a push FCM accepted is not sent
+    twice. Both steps are retried with exponential backoff. When the
+    queue is full the notification is delivered inline instead, with a
+    single attempt at each step so the request never sleeps on a backoff.
+
+    `db` and `send_pushes` are all the outbox talks to, so local stand-ins
+    for Firestore and messaging are enough to drive it.
+    """
+
+    def __init__(self, db, send_pushes=None, max_queue=None, batch_size=None,
+                 flush_interval=None, max_attempts=None, retry_backoff=None):
+        self._db = db
+        self._send_pushes = send_pushes
+        self.batch_size = min(batch_size or Config.NOTIFICATION_BATCH_SIZE, BATCH_LIMIT)
+        self.flush_interval = flush_interval if flush_interval is not None else Config.NOTIFICATION_FLUSH_INTERVAL
+        self.max_attempts = max_attempts or Config.NOTIFICATION_MAX_ATTEMPTS
+        self.retry_backoff = retry_backoff if retry_backoff is not None else Config.NOTIFICATION_RETRY_BACKOFF
+        self._queue = queue.Queue(maxsize=max_queue or Config.NOTIFICATION_QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.written = 0
+        self.pushed = 0
+        self.retries = 0
+        self.failed = 0
+        self.overflowed = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='notification-outbox', daemon=True)
+                self._thread.start()
+        return self
+
+    def enqueue(self, user_id, notification_type, title, message, push=True, **fields):
+        """Queue a notification for user_id; extra fields are stored with it"""
+        notification = {
+            'userId': user_id,
+            'type': notification_type,
+            'title': title,
+            'message': message,
+            **fields,
+            'read': False,
+            'createdAt': datetime.utcnow()
+        }
+        try:
+            self._queue.put_nowait((notification, push))
+        except queue.Full:
+            with self._lock:
+                self.overflowed += 1
+            self._deliver([(notification, push)], attempts=1)
+
+    def flush(self, timeout=None):
+        """Wait until everything queued so far is delivered; False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            # Give a burst a moment to gather into one batch
+            deadline = time.monotonic() + self.flush_interval
+            while len(items) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._deliver(items)
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+
+    def _deliver(self, items, attempts=None):
+        attempts = attempts or self.max_attempts
+        # IDs are fixed up front so a retried commit rewrites the same documents
+        collection = self._db.collection('notifications')
+        writes = [(collection.document(), notification) for notification, _ in items]
+        if not self._retry(lambda: self._write(writes), len(items), 'writing notifications', attempts):
+            return
+
+        pushes = [notification for notification, push in items if push]
+        if pushes and self._send_pushes is not None:
+            self._push(pushes, attempts)
+
+    def _push(self, pushes, attempts):
+        pending = pushes
+        for attempt in range(attempts):
+            try:
+                pending = self._send_pushes(pending) or []
+            except Exception as e:
+                # Raised before anything went out, so all of pending is still owed
+                print(f"Error sending pushes: {str(e)}")
+            if not pending or attempt + 1 == attempts:
+                break
+            with self._lock:
+                self.retries += 1
+            time.sleep(min(self.retry_backoff * 2 ** attempt, MAX_BACKOFF))
+
+        with self._lock:
+            self.pushed += len(pushes) - len(pending)
+            self.failed += len(pending)
+        if pending:
+            print(f"Error sending pushes, dropping {len(pending)}")
+
+    def _write(self, writes):
+        batch = self._db.batch()
+        for ref, notification in writes:
+            batch.set(ref, notification)
+        batch.commit()
+        with self._lock:
+            self.written += len(writes)
+
+    def _retry(self, action, count, what, attempts):
+        for attempt in range(attempts):
+            try:
+                action()
+                return True
+            except Exception as e:
+                if attempt + 1 == attempts:
+                    with self._lock:
+                        self.failed += count
+                    print(f"Error {what}, dropping {count}: {str(e)}")
+                    return False
+                with self._lock:
+                    self.retries += 1
+                time.sleep(min(self.retry_backoff * 2 ** attempt, MAX_BACKOFF))
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'queued': self._queue.qsize(),
+                'written': self.written,
+                'pushed': self.pushed,
+                'retries': self.retries,
+                'failed': self.failed,
+                'overflowed': self.overflowed
+            }
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+def get_notification_outbox():
+    """Return the process-wide outbox, starting its worker on first use"""
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            from app import db
+            from services.notification_service import send_notification_pushes
+            _outbox = NotificationOutbox(db, send_notification_pushes).start()
+            # Give queued notifications a chance to go out on shutdown
+            atexit.register(_outbox.flush, 5)
+        return _outbox
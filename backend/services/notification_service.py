@@ -1,16 +1,18 @@
-from firebase_admin import messaging
+from concurrent.futures import ThreadPoolExecutor
+from firebase_admin import exceptions, firestore, messaging
+from services.profile_cache import get_profile_cache
+from config import Config
 from app import db
 
 def send_push_notification(user_id, title, body, data=None):
     """Send push notification to user"""
     try:
         # Get user's FCM token
-        user_doc = db.collection('users').document(user_id).get()
+        user_data = get_profile_cache().get(user_id)
         
-        if not user_doc.exists:
+        if user_data is None:
             return False
         
-        user_data = user_doc.to_dict()
         fcm_token = user_data.get('fcmToken')
         
         if not fcm_token:
@@ -35,36 +37,153 @@ def send_push_notification(user_id, title, body, data=None):
         print(f'Error sending notification: {str(e)}')
         return False
 
+# Notification fields that are not sent as push data
+PUSH_EXCLUDED_FIELDS = {'userId', 'title', 'message', 'read', 'createdAt'}
+MAX_MESSAGES_PER_SEND = 500  # FCM's cap for send_each and for tokens per multicast
+BATCH_LIMIT = 500  # Firestore's cap on writes per batch
+
+# Send errors meaning the token will never work again
+STALE_TOKEN_ERRORS = (messaging.UnregisteredError, messaging.SenderIdMismatchError)
+# Send errors worth another attempt later
+RETRYABLE_SEND_ERRORS = (exceptions.UnavailableError, exceptions.InternalError,
+                         exceptions.DeadlineExceededError, messaging.QuotaExceededError)
+
+def fetch_tokens(user_ids):
+    """{user_id: fcmToken} for the given users, in one batched read of that field"""
+    refs = [db.collection('users').document(user_id) for user_id in dict.fromkeys(user_ids)]
+    if not refs:
+        return {}
+    tokens = {}
+    for snapshot in db.get_all(refs, field_paths=['fcmToken']):
+        token = (snapshot.to_dict() or {}).get('fcmToken') if snapshot.exists else None
+        if token:
+            tokens[snapshot.id] = token
+    return tokens
+
+def stale_tokens(tokens, batch_response):
+    """Tokens of a send the responses flag as unregistered, in send order"""
+    return [token for token, response in zip(tokens, batch_response.responses)
+            if not response.success and isinstance(response.exception, STALE_TOKEN_ERRORS)]
+
+def prune_tokens(stale):
+    """Remove dead tokens from user profiles, given {user_id: token}
+    
+    A user who registered a new token since the send keeps it: each
+    delete only applies if the profile still holds the stale token.
+    """
+    current = fetch_tokens(stale)
+    user_ids = [user_id for user_id, token in stale.items() if current.get(user_id) == token]
+    for start in range(0, len(user_ids), BATCH_LIMIT):
+        batch = db.batch()
+        for user_id in user_ids[start:start + BATCH_LIMIT]:
+            batch.update(db.collection('users').document(user_id), {'fcmToken': firestore.DELETE_FIELD})
+        batch.commit()
+    get_profile_cache().invalidate_many(user_ids)
+    return len(user_ids)
+
+def send_notification_pushes(notifications):
+    """Send each stored notification to its user's device
+    
+    Used by the notification outbox. Tokens are read in one batched
+    lookup; users without an FCM token are skipped and unregistered
+    tokens are pruned. Returns the notifications
+    that were not sent but may go through later: those of a chunk whose
+    send failed outright, and those FCM turned down with a transient
+    error. Pushes FCM accepted are never in it, so retrying just the
+    returned list cannot deliver one twice.
+    """
+    tokens = fetch_tokens([notification['userId'] for notification in notifications])
+    messages = []
+    owners = []
+    for notification in notifications:
+        fcm_token = tokens.get(notification['userId'])
+        if not fcm_token:
+            continue
+        
+        messages.append(messaging.Message(
+            notification=messaging.Notification(
+                title=notification['title'],
+                body=notification['message']
+            ),
+            # FCM data values must be strings
+            data={key: str(value) for key, value in notification.items()
+                  if key not in PUSH_EXCLUDED_FIELDS and value is not None},
+            token=fcm_token
+        ))
+        owners.append((notification, fcm_token))
+    
+    unsent = []
+    stale = {}
+    for start in range(0, len(messages), MAX_MESSAGES_PER_SEND):
+        chunk = owners[start:start + MAX_MESSAGES_PER_SEND]
+        try:
+            response = messaging.send_each(messages[start:start + MAX_MESSAGES_PER_SEND])
+        except Exception as e:
+            print(f"Error sending notification pushes: {str(e)}")
+            unsent.extend(notification for notification, _ in chunk)
+            continue
+        dead = set(stale_tokens([token for _, token in chunk], response))
+        stale.update((notification['userId'], token) for notification, token in chunk if token in dead)
+        unsent.extend(notification for (notification, _), result in zip(chunk, response.responses)
+                      if not result.success and isinstance(result.exception, RETRYABLE_SEND_ERRORS))
+    
+    # Pushes have gone out by now, so a failure here must not resend them
+    if stale:
+        try:
+            prune_tokens(stale)
+        except Exception as e:
+            print(f"Error pruning stale tokens: {str(e)}")
+    return unsent
+
 def send_multicast_notification(user_ids, title, body, data=None):
-    """Send notification to multiple users"""
+    """Send notification to multiple users
+    
+    Tokens are read in one batched lookup and sent in multicasts of up to
+    500 on a small thread pool. Tokens FCM reports as unregistered are
+    removed from their profiles. Returns True if any device accepted it.
+    """
     try:
-        # Get FCM tokens
-        tokens = []
-        for user_id in user_ids:
-            user_doc = db.collection('users').document(user_id).get()
-            if user_doc.exists:
-                token = user_doc.to_dict().get('fcmToken')
-                if token:
-                    tokens.append(token)
+        # Get FCM tokens; one device may be signed in to several accounts
+        owners = {}
+        for user_id, token in fetch_tokens(user_ids).items():
+            owners.setdefault(token, []).append(user_id)
         
+        tokens = list(owners)
         if not tokens:
             return False
         
-        # Create multicast message
-        message = messaging.MulticastMessage(
-            notification=messaging.Notification(
-                title=title,
-                body=body
-            ),
-            data=data or {},
-            tokens=tokens
-        )
+        def send_chunk(chunk):
+            message = messaging.MulticastMessage(
+                notification=messaging.Notification(
+                    title=title,
+                    body=body
+                ),
+                data=data or {},
+                tokens=chunk
+            )
+            return chunk, messaging.send_each_for_multicast(message)
         
-        # Send message
-        response = messaging.send_multicast(message)
-        print(f'Successfully sent {response.success_count} notifications')
-        return True
+        chunks = [tokens[start:start + MAX_MESSAGES_PER_SEND]
+                  for start in range(0, len(tokens), MAX_MESSAGES_PER_SEND)]
+        workers = max(1, min(Config.FCM_SEND_WORKERS, len(chunks)))
+        
+        success_count = 0
+        failure_count = 0
+        stale = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for chunk, response in executor.map(send_chunk, chunks):
+                success_count += response.success_count
+                failure_count += response.failure_count
+                for token in stale_tokens(chunk, response):
+                    stale.update((user_id, token) for user_id in owners[token])
+        
+        if stale:
+            prune_tokens(stale)
+        
+        print(f'Sent {success_count} notifications, {failure_count} failed, '
+              f'{len(stale)} stale tokens removed')
+        return success_count > 0
         
     except Exception as e:
         print(f'Error sending multicast notification: {str(e)}')
-        return False
\ No newline at end of file
+        return False
@@ -0,0 +1,36 @@
+import base64
+import json
+from datetime import datetime
+
+def encode_page_cursor(timestamp, doc_id):
+    """Opaque keyset cursor for the row (timestamp, doc_id) of a listing"""
+    raw = json.dumps(
+        [timestamp.isoformat() if timestamp else None, doc_id],
+        separators=(',', ':')
+    ).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_page_cursor(cursor):
+    """Inverse of encode_page_cursor; raises ValueError on malformed input"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, doc_id = json.loads(base64.urlsafe_b64decode(padded))
+        timestamp = datetime.fromisoformat(timestamp) if timestamp else None
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(doc_id, str) or not doc_id:
+        raise ValueError('Invalid cursor')
+    return timestamp, doc_id
+
+def parse_fields(value, allowed):
+    """Field list from a comma-separated query parameter, or None for all fields
+
+    Raises ValueError naming any field outside `allowed`.
+    """
+    if not value:
+        return None
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
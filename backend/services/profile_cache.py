@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import OrderedDict
+from config import Config
+
+class ProfileCache:
+    """Bounded LRU cache of users/{id} documents with a TTL
+
+    Entries are dropped as soon as the users listener reports a change, or
+    when one of our own routes writes the profile, so the TTL only bounds how
+    stale a profile can get if both of those are missed. Only existing
+    profiles are cached.
+    """
+
+    def __init__(self, db, max_entries=None, ttl_seconds=None, collection='users'):
+        self._db = db
+        self._collection = collection
+        self.max_entries = max_entries or Config.PROFILE_CACHE_SIZE
+        self.ttl = ttl_seconds or Config.PROFILE_CACHE_TTL
+        self._entries = OrderedDict()  # user_id -> (expires_at, profile)
+        self._loading = {}  # user_id -> token of the read in flight
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, user_id):
+        """A copy of the user's profile, or None if it does not exist"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[user_id]
+                self.expirations += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return dict(entry[1])
+            self.misses += 1
+            token = object()
+            self._loading[user_id] = token
+
+        user_doc = self._db.collection(self._collection).document(user_id).get()
+        profile = user_doc.to_dict() if user_doc.exists else None
+
+        with self._lock:
+            # Skip the store if the profile was invalidated while we read it
+            if self._loading.get(user_id) is token:
+                del self._loading[user_id]
+                if profile is not None:
+                    self._store(user_id, profile)
+        return dict(profile) if profile is not None else None
+
+    def _store(self, user_id, profile):
+        self._entries[user_id] = (time.monotonic() + self.ttl, profile)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, user_id):
+        """Forget a user's profile after it changed"""
+        self.invalidate_many([user_id])
+
+    def invalidate_many(self, user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._loading.pop(user_id, None)
+                if self._entries.pop(user_id, None) is not None:
+                    self.invalidations += 1
+
+    def snapshot(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxEntries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hitRate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+
+_profile_cache = None
+_profile_cache_lock = threading.Lock()
+
+def get_profile_cache():
+    """Return the process-wide profile cache, invalidated by the users listener"""
+    global _profile_cache
+    with _profile_cache_lock:
+        if _profile_cache is None:
+            from app import db
+            from services.candidate_index import get_candidate_index
+            _profile_cache = ProfileCache(db)
+            get_candidate_index().subscribe(_profile_cache.invalidate_many)
+        return _profile_cache
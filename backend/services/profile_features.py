@@ -0,0 +1,135 @@
+import math
+from datetime import datetime
+from services.geo_service import encode_geohash, location_for
+from services.tech_vocabulary import tech_mask, mask_to_words, words_to_mask
+
+FEATURES_VERSION = 2
+
+class Vocabulary:
+    """Interns hashable values (including None) into small integer codes"""
+
+    def __init__(self):
+        self._codes = {}
+
+    def intern(self, value):
+        try:
+            code = self._codes.get(value)
+        except TypeError:
+            return -2
+        if code is None:
+            code = len(self._codes)
+            self._codes[value] = code
+        return code
+
+    def lookup(self, value):
+        try:
+            return self._codes.get(value, -1)
+        except TypeError:
+            return -1
+
+    def __len__(self):
+        return len(self._codes)
+
+# Codes are process-local, so only the raw strings are persisted
+values = Vocabulary()
+
+def as_number(value):
+    try:
+        return float(value) if value is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+def _parse_dob(dob_string):
+    """Return (year, month * 100 + day), or (0, 0) where calculate_age would give 0"""
+    try:
+        dob = datetime.strptime(dob_string, '%Y-%m-%d')
+        return dob.year, dob.month * 100 + dob.day
+    except Exception:
+        return 0, 0
+
+class ProfileFeatures:
+    """Normalized matching inputs for one profile
+
+    Derived once when a profile is written and stored under `features`;
+    profiles written before that are derived lazily on first load.
+    """
+
+    __slots__ = (
+        'birth_year', 'birth_mmdd', 'experience', 'tech_mask',
+        'lat', 'lng', 'geohash',
+        'religion', 'city', 'state', 'work_type'
+    )
+
+    def __init__(self, profile, birth_year, birth_mmdd, experience, mask, lat, lng, geohash):
+        self.birth_year = birth_year
+        self.birth_mmdd = birth_mmdd
+        self.experience = experience
+        self.tech_mask = mask
+        self.lat = math.nan if lat is None else lat
+        self.lng = math.nan if lng is None else lng
+        self.geohash = geohash or (encode_geohash(lat, lng) if lat is not None else '')
+        self.religion = values.intern(profile.get('religion'))
+        self.city = values.intern(profile.get('city'))
+        self.state = values.intern(profile.get('state'))
+        self.work_type = values.intern((profile.get('developerInfo') or {}).get('workType'))
+
+    @classmethod
+    def from_profile(cls, profile, intern=False):
+        """Derive features from the raw profile fields
+
+        The profile write path passes intern=True so new technologies get
+        a bit; see tech_mask.
+        """
+        dev_info = profile.get('developerInfo') or {}
+        birth_year, birth_mmdd = _parse_dob(profile.get('dateOfBirth'))
+        location = profile.get('location') or location_for(profile.get('city')) or {}
+        return cls(
+            profile,
+            birth_year,
+            birth_mmdd,
+            as_number(dev_info.get('yearsOfExperience', 0)),
+            tech_mask(profile, intern),
+            location.get('lat'),
+            location.get('lng'),
+            location.get('geohash')
+        )
+
+    @classmethod
+    def load(cls, profile):
+        """Use the stored features map when present, else derive it"""
+        stored = profile.get('features')
+        if not stored or stored.get('version') != FEATURES_VERSION:
+            return cls.from_profile(profile)
+        return cls(
+            profile,
+            stored['birthYear'],
+            stored['birthMonthDay'],
+            stored['experience'],
+            words_to_mask(stored['techMask']),
+            stored.get('lat'),
+            stored.get('lng'),
+            stored.get('geohash')
+        )
+
+    def to_document(self):
+        return {
+            'version': FEATURES_VERSION,
+            'birthYear': self.birth_year,
+            'birthMonthDay': self.birth_mmdd,
+            'experience': self.experience,
+            'techMask': mask_to_words(self.tech_mask),
+            'lat': None if math.isnan(self.lat) else self.lat,
+            'lng': None if math.isnan(self.lng) else self.lng,
+            'geohash': self.geohash or None
+        }
+
+    @property
+    def has_location(self):
+        return not math.isnan(self.lat)  # NaN when the city could not be geocoded
+
+    def age(self, today=None):
+        """Age as of today, 0 where dateOfBirth was missing or malformed"""
+        if not self.birth_year:
+            return 0
+        today = today or datetime.today()
+        return today.year - self.birth_year - ((today.month * 100 + today.day) < self.birth_mmdd)
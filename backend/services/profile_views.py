@@ -0,0 +1,49 @@
+from services.profile_features import ProfileFeatures
+
+TOP_TECH_COUNT = 3
+
+# Stored for matching and push delivery only, never sent to a client
+INTERNAL_FIELDS = ('features', 'location', 'fcmToken', 'fcmTokenUpdatedAt')
+
+def apply_privacy(profile, viewer_id, owner_id):
+    """Strip internal fields, and what the owner's privacy settings hide
+    from other viewers
+
+    Works on the given dict in place and returns it.
+    """
+    for field in INTERNAL_FIELDS:
+        profile.pop(field, None)
+
+    if viewer_id == owner_id:
+        return profile
+
+    privacy = profile.get('privacy') or {}
+    if privacy.get('hideContact'):
+        profile.pop('phone', None)
+        profile.pop('email', None)
+
+    if privacy.get('hidePhotos'):
+        profile['photos'] = []
+
+    return profile
+
+def match_card(viewer_id, user_id, profile, score, today=None):
+    """Card-sized view of a candidate for discover results
+
+    The full profile is only sent when the card is opened, through
+    GET /api/profiles/<user_id>, with the same privacy rules.
+    """
+    developer_info = profile.get('developerInfo') or {}
+    hides_photos = viewer_id != user_id and (profile.get('privacy') or {}).get('hidePhotos')
+    photos = profile.get('photos') or []
+    return {
+        'userId': user_id,
+        'fullName': profile.get('fullName'),
+        'age': ProfileFeatures.load(profile).age(today),
+        'city': profile.get('city'),
+        'state': profile.get('state'),
+        'role': developer_info.get('role'),
+        'topTech': list(developer_info.get('techStack') or [])[:TOP_TECH_COUNT],
+        'photo': photos[0].get('url') if photos and not hides_photos else None,
+        'matchScore': score
+    }
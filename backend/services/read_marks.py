@@ -0,0 +1,59 @@
+import threading
+import time
+from config import Config
+
+class ReadMarkCoalescer:
+    """Limits read-mark writes to one per window per user and conversation
+
+    A mark requested inside the window is not dropped: one trailing write
+    is scheduled for the end of the window. It runs the write_later of the
+    latest mark that came in meanwhile, which should only clear what that
+    read covered, since messages may have arrived since.
+    """
+
+    def __init__(self, window_seconds=None, max_entries=100000):
+        self.window = window_seconds if window_seconds is not None else Config.CHAT_READ_MARK_WINDOW
+        self.max_entries = max_entries
+        self._marked_at = {}  # (conversation_id, user_id) -> monotonic time of last write
+        self._trailing = {}  # (conversation_id, user_id) -> write_later of the latest coalesced mark
+        self._lock = threading.Lock()
+
+    def mark(self, conversation_id, user_id, write, write_later):
+        """Call write() now, or write_later() once the window ends
+
+        Returns True if write() ran now; exceptions from it propagate.
+        Errors in a trailing write are logged.
+        """
+        key = (conversation_id, user_id)
+        now = time.monotonic()
+        with self._lock:
+            last = self._marked_at.get(key)
+            if last is not None and now - last < self.window:
+                if key not in self._trailing:
+                    timer = threading.Timer(self.window - (now - last), self._flush, (key,))
+                    timer.daemon = True
+                    timer.start()
+                self._trailing[key] = write_later
+                return False
+            if len(self._marked_at) >= self.max_entries:
+                self._marked_at = {k: t for k, t in self._marked_at.items() if now - t < self.window}
+            self._marked_at[key] = now
+        try:
+            write()
+        except Exception:
+            # Nothing was marked, so later marks must not be coalesced into it
+            with self._lock:
+                self._marked_at.pop(key, None)
+            raise
+        return True
+
+    def _flush(self, key):
+        with self._lock:
+            write_later = self._trailing.pop(key)
+            self._marked_at[key] = time.monotonic()
+        try:
+            write_later()
+        except Exception as e:
+            print(f"Error writing read mark: {str(e)}")
+
+read_marks = ReadMarkCoalescer()
@@ -0,0 +1,130 @@
+import queue
+import threading
+import time
+from datetime import datetime
+from config import Config
+from middleware.json_provider import dumps_bytes
+
+class Subscription:
+    """One open event stream of a user"""
+
+    def __init__(self, user_id, max_pending):
+        self.user_id = user_id
+        self.closed = False
+        self._queue = queue.Queue(maxsize=max_pending)
+
+    def get(self, timeout):
+        """Next encoded event, or None if nothing arrived within timeout"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def put(self, event):
+        """Queue an encoded event; False if the client has fallen too far behind"""
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            return False
+
+class RealtimeHub:
+    """In-process pub/sub for chat events, with presence
+
+    Events only reach streams held open on this process; with several
+    workers, a message handled by another one is not pushed. The chat
+    client therefore keeps polling GET /api/chat/messages/<id>?since=...
+    at a low rate while its stream is open, and again whenever it
+    reconnects, which also covers streams dropped for falling behind.
+    """
+
+    def __init__(self, max_pending=None):
+        self.max_pending = max_pending or Config.CHAT_STREAM_MAX_PENDING
+        self._subscriptions = {}  # user_id -> set of Subscription
+        self._last_seen = {}  # user_id -> datetime the last stream closed
+        self._lock = threading.Lock()
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, user_id):
+        subscription = Subscription(user_id, self.max_pending)
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscription.closed = True
+        with self._lock:
+            streams = self._subscriptions.get(subscription.user_id)
+            if streams is None or subscription not in streams:
+                return
+            streams.discard(subscription)
+            if not streams:
+                del self._subscriptions[subscription.user_id]
+                self._last_seen[subscription.user_id] = datetime.utcnow()
+
+    def publish(self, user_ids, event_type, data):
+        """Send an event to every open stream of the given users
+
+        Returns how many streams it reached. A stream whose queue is full
+        is closed instead of blocking the publisher.
+        """
+        event = encode_event(event_type, data)
+        with self._lock:
+            targets = [s for user_id in set(user_ids) for s in self._subscriptions.get(user_id, ())]
+            self.published += 1
+
+        delivered = 0
+        for subscription in targets:
+            if subscription.put(event):
+                delivered += 1
+            else:
+                self.dropped += 1
+                self.unsubscribe(subscription)
+        return delivered
+
+    def is_online(self, user_id):
+        with self._lock:
+            return user_id in self._subscriptions
+
+    def presence(self, user_ids):
+        """{user_id: {'online': bool, 'lastSeen': datetime or None}}"""
+        with self._lock:
+            return {
+                user_id: {
+                    'online': user_id in self._subscriptions,
+                    'lastSeen': None if user_id in self._subscriptions else self._last_seen.get(user_id)
+                }
+                for user_id in user_ids
+            }
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'onlineUsers': len(self._subscriptions),
+                'streams': sum(len(streams) for streams in self._subscriptions.values()),
+                'published': self.published,
+                'dropped': self.dropped
+            }
+
+def encode_event(event_type, data):
+    """Server-sent event frame for one event"""
+    return b'event: ' + event_type.encode('utf-8') + b'\ndata: ' + dumps_bytes(data) + b'\n\n'
+
+def stream_events(hub, subscription, expires_at=None):
+    """Frames for one open stream, with keep-alive comments while idle
+
+    Ends when the subscription is dropped or at expires_at (epoch seconds),
+    so the client reconnects with a fresh ID token.
+    """
+    try:
+        yield b'retry: 3000\n\n'
+        while not subscription.closed:
+            if expires_at is not None and time.time() >= expires_at:
+                break
+            event = subscription.get(timeout=Config.CHAT_STREAM_KEEPALIVE)
+            yield event if event is not None else b': keepalive\n\n'
+    finally:
+        hub.unsubscribe(subscription)
+
+hub = RealtimeHub()
@@ -0,0 +1,76 @@
+import base64
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+# Rough per-entry footprint of a cached (score, userId, profile) tuple; the
+# profile itself is shared with the candidate index and not counted.
+ENTRY_OVERHEAD_BYTES = 120
+
+def preferences_hash(preferences):
+    """Stable digest of a preferences map, used to key cached result sets"""
+    encoded = json.dumps(preferences or {}, sort_keys=True, default=str)
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+def encode_cursor(score, user_id):
+    """Opaque cursor pointing just after (score, user_id) in a ranking"""
+    raw = json.dumps([score, user_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError on malformed input"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        score, user_id = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(score, int) or not isinstance(user_id, str):
+        raise ValueError('Invalid cursor')
+    return score, user_id
+
+class ResultCache:
+    """LRU cache of ranked result sets with a TTL and a memory budget"""
+
+    def __init__(self, max_bytes, ttl_seconds):
+        self.max_bytes = max_bytes
+        self.ttl = ttl_seconds
+        self._entries = OrderedDict()  # key -> (expires_at, size, ranking)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _size_of(ranking):
+        return sum(ENTRY_OVERHEAD_BYTES + len(user_id) for _, user_id, _ in ranking)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, size, ranking = entry
+            if expires_at < time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return ranking
+
+    def put(self, key, ranking):
+        size = self._size_of(ranking)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, size, ranking)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def __len__(self):
+        return len(self._entries)
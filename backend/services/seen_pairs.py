@@ -0,0 +1,189 @@
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from config import Config
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings"""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+class ScalableBloomFilter:
+    """Bloom filter that adds tighter stages as it fills, keeping the overall
+    false-positive rate under error_rate"""
+
+    def __init__(self, error_rate, initial_capacity=256):
+        self.error_rate = error_rate
+        self._stages = [BloomFilter(initial_capacity, error_rate / 2)]
+
+    def add(self, item):
+        if item in self:
+            return
+        stage = self._stages[-1]
+        if stage.count >= stage.capacity:
+            stage = BloomFilter(stage.capacity * 2, stage.error_rate / 2)
+            self._stages.append(stage)
+        stage.add(item)
+
+    def __contains__(self, item):
+        return any(item in stage for stage in self._stages)
+
+    def __len__(self):
+        return sum(stage.count for stage in self._stages)
+
+class SeenPairs:
+    """Per-user sets of candidates that discover should no longer show
+
+    A user has seen everyone they sent a request to, and everyone whose
+    request they answered. Sets are built from the matches collection on
+    first use and held for a bounded number of users. The match routes
+    mark their own writes at once; listeners on matches created or
+    answered since start() bring in those of other processes, and the TTL
+    bounds how stale a set can get if both are missed. With mode 'bloom'
+    a Bloom filter replaces the exact set and may hide a candidate at the
+    configured false-positive rate.
+    """
+
+    def __init__(self, db, mode=None, error_rate=None, max_users=None, ttl_seconds=None):
+        self._db = db
+        self.mode = mode or Config.SEEN_PAIRS_MODE
+        self.error_rate = error_rate or Config.SEEN_PAIRS_FALSE_POSITIVE_RATE
+        self.max_users = max_users or Config.SEEN_PAIRS_MAX_USERS
+        self.ttl = ttl_seconds or Config.SEEN_PAIRS_TTL
+        self._users = OrderedDict()  # user_id -> (expires_at, seen)
+        self._loading = {}  # user_id -> lists collecting marks made during a load
+        self._lock = threading.Lock()
+        self._watches = []
+
+    def start(self, since=None):
+        """Follow requests sent and answered from here on, in any process"""
+        since = since or datetime.utcnow()
+        matches = self._db.collection('matches')
+        with self._lock:
+            if not self._watches:
+                self._watches = [
+                    matches.where('createdAt', '>=', since).on_snapshot(self._on_sent),
+                    matches.where('respondedAt', '>=', since).on_snapshot(self._on_answered)
+                ]
+        return self
+
+    def stop(self):
+        with self._lock:
+            watches, self._watches = self._watches, []
+        for watch in watches:
+            watch.unsubscribe()
+
+    def _on_sent(self, col_snapshot, changes, read_time):
+        for change in changes:
+            try:
+                if change.type.name != 'REMOVED':
+                    match = change.document.to_dict()
+                    self.mark(match['senderId'], match['receiverId'])
+            except Exception as e:
+                print(f"Error applying match {change.document.id}: {str(e)}")
+
+    def _on_answered(self, col_snapshot, changes, read_time):
+        for change in changes:
+            try:
+                match = change.document.to_dict()
+                if change.type.name != 'REMOVED' and match.get('status') in ('accepted', 'rejected'):
+                    self.mark(match['receiverId'], match['senderId'])
+            except Exception as e:
+                print(f"Error applying match {change.document.id}: {str(e)}")
+
+    def _new_set(self):
+        return ScalableBloomFilter(self.error_rate) if self.mode == 'bloom' else set()
+
+    def _load(self, user_id):
+        seen = self._new_set()
+        sent = self._db.collection('matches')\
+            .where('senderId', '==', user_id)\
+            .select(['receiverId'])\
+            .stream()
+        for match in sent:
+            if match.get('receiverId'):
+                seen.add(match.get('receiverId'))
+
+        received = self._db.collection('matches')\
+            .where('receiverId', '==', user_id)\
+            .where('status', 'in', ['accepted', 'rejected'])\
+            .select(['senderId'])\
+            .stream()
+        for match in received:
+            if match.get('senderId'):
+                seen.add(match.get('senderId'))
+        return seen
+
+    def for_user(self, user_id):
+        """The user's seen set, loading it from Firestore on first use"""
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None and entry[0] >= time.monotonic():
+                self._users.move_to_end(user_id)
+                return entry[1]
+            marks = []
+            self._loading.setdefault(user_id, []).append(marks)
+
+        try:
+            seen = self._load(user_id)
+        finally:
+            with self._lock:
+                loading = self._loading[user_id]
+                loading.remove(marks)
+                if not loading:
+                    del self._loading[user_id]
+
+        with self._lock:
+            # The query may have run before these were written
+            for other_id in marks:
+                seen.add(other_id)
+            self._users[user_id] = (time.monotonic() + self.ttl, seen)
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+            return seen
+
+    def mark(self, user_id, other_id):
+        """Record that user_id has acted on other_id"""
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None:
+                entry[1].add(other_id)
+            for marks in self._loading.get(user_id, ()):
+                marks.append(other_id)
+
+_seen_pairs = None
+_seen_pairs_lock = threading.Lock()
+
+def get_seen_pairs():
+    """Return the process-wide seen-pair store, starting its listeners on first use"""
+    global _seen_pairs
+    with _seen_pairs_lock:
+        if _seen_pairs is None:
+            from app import db
+            _seen_pairs = SeenPairs(db).start()
+        return _seen_pairs
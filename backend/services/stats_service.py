@@ -0,0 +1,114 @@
+import random
+from firebase_admin import firestore
+from config import Config
+
+# Dashboard counters maintained by the write paths. Each lives in
+# stats/{name}/shards/{n}; writers bump one random shard so concurrent
+# updates do not contend on a single document.
+PROFILE_COUNTERS = ('totalUsers', 'premiumUsers', 'pendingVerifications')
+COUNTERS = PROFILE_COUNTERS + ('totalMatches',)
+
+# How to count each maintained stat from scratch, used to seed a counter
+# the first time it is read
+SEED_QUERIES = {
+    'totalUsers': lambda db: db.collection('users'),
+    'premiumUsers': lambda db: db.collection('users').where('isPremium', '==', True),
+    'pendingVerifications': lambda db: db.collection('users').where('verification.profileVerified', '==', False),
+    'totalMatches': lambda db: db.collection('matches'),
+}
+
+def _shards(db, name):
+    return db.collection('stats').document(name).collection('shards')
+
+def count_query(query):
+    """Server-side count() aggregation; reads no documents"""
+    return int(query.count(alias='count').get()[0][0].value)
+
+def increment(db, name, amount=1, batch=None):
+    """Add amount to a counter, inside `batch` when one is given"""
+    if not amount:
+        return
+    shard = _shards(db, name).document(str(random.randrange(Config.STATS_COUNTER_SHARDS)))
+    data = {'count': firestore.Increment(amount)}
+    if batch is not None:
+        batch.set(shard, data, merge=True)
+    else:
+        shard.set(data, merge=True)
+
+def profile_counts(profile):
+    """Contribution of one users/{id} document to the profile counters"""
+    if profile is None:
+        return {name: 0 for name in PROFILE_COUNTERS}
+    return {
+        'totalUsers': 1,
+        'premiumUsers': 1 if profile.get('isPremium') else 0,
+        'pendingVerifications': 0 if (profile.get('verification') or {}).get('profileVerified') else 1
+    }
+
+def record_profile_change(db, before, after, batch=None):
+    """Adjust the profile counters for a profile going from `before` to `after`
+
+    Either side may be None for a missing document. Only the fields read by
+    profile_counts need to be present.
+    """
+    old, new = profile_counts(before), profile_counts(after)
+    for name in PROFILE_COUNTERS:
+        increment(db, name, new[name] - old[name], batch)
+
+def _shard_refs(db, name):
+    return [_shards(db, name).document(str(i)) for i in range(Config.STATS_COUNTER_SHARDS)]
+
+def read_counters(db, names=COUNTERS):
+    """{name: value} with every counter and shard fetched in one batched read
+
+    A counter not seeded yet by scripts/seed_stats_counters.py would miss
+    documents written before it existed, so it is answered with a count()
+    aggregation instead. Nothing is written here.
+    """
+    counter_refs = [db.collection('stats').document(name) for name in names]
+    shard_refs = [ref for name in names for ref in _shard_refs(db, name)]
+    totals = {name: 0 for name in names}
+    seeded = set()
+    for snapshot in db.get_all(counter_refs + shard_refs):
+        if not snapshot.exists:
+            continue
+        data = snapshot.to_dict()
+        if snapshot.reference.parent.id == 'stats':
+            if data.get('seededAt'):
+                seeded.add(snapshot.id)
+        else:
+            totals[snapshot.reference.parent.parent.id] += data.get('count') or 0
+
+    for name in names:
+        if name not in seeded:
+            totals[name] = count_query(SEED_QUERIES[name](db))
+    return totals
+
+@firestore.transactional
+def _seed_in_transaction(transaction, db, name, actual, force):
+    counter_ref = db.collection('stats').document(name)
+    counter = counter_ref.get(transaction=transaction)
+    if not force and counter.exists and (counter.to_dict() or {}).get('seededAt'):
+        return False
+
+    shard_refs = _shard_refs(db, name)
+    for shard in transaction.get_all(shard_refs):
+        if shard.exists and shard.id != '0':
+            transaction.delete(shard.reference)
+    # Shard 0 holds the count; increments from then on add to it
+    transaction.set(shard_refs[0], {'count': actual})
+    transaction.set(counter_ref, {'seededAt': firestore.SERVER_TIMESTAMP}, merge=True)
+    return True
+
+def seed_counter(db, name, force=False):
+    """Set a counter to its count() aggregation, once
+
+    Runs in a transaction guarded on seededAt, so concurrent runs cannot
+    both apply. Writes landing between the count and the commit are not
+    reflected, so seed while the app is quiet. Returns the value seeded,
+    or None if the counter was already seeded and force is False.
+    """
+    actual = count_query(SEED_QUERIES[name](db))
+    if not _seed_in_transaction(db.transaction(), db, name, actual, force):
+        return None
+    return actual
@@ -0,0 +1,149 @@
+import threading
+from functools import lru_cache
+from firebase_admin import firestore
+from config import Config
+
+VOCABULARY_DOC = ('meta', 'techVocabulary')
+
+def normalize_term(term):
+    """The key a technology is matched by: trimmed and casefolded"""
+    return term.strip().casefold()
+
+class TechVocabulary:
+    """Process-local mirror of the global technology -> bit position table
+
+    The table lives in meta/techVocabulary as an append-only list, so a
+    term's position never changes once assigned and bitmasks written by any
+    process stay comparable. Terms are matched by normalize_term, so
+    "Python" and " python" share a bit.
+
+    Only the profile write path adds terms, up to max_terms of them; a
+    term not in the table by then is left out of masks.
+    """
+
+    def __init__(self, db, max_terms=None):
+        self._db = db
+        self.max_terms = max_terms or Config.TECH_VOCABULARY_MAX_TERMS
+        self._terms = []
+        self._ids = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _ref(self):
+        return self._db.collection(VOCABULARY_DOC[0]).document(VOCABULARY_DOC[1])
+
+    def _apply(self, terms):
+        # Only ever extend: positions are permanent. Tables written before
+        # normalization may hold one term twice; the first position wins.
+        for term in terms[len(self._terms):]:
+            self._ids.setdefault(normalize_term(term), len(self._terms))
+            self._terms.append(term)
+
+    def load(self):
+        snapshot = self._ref().get()
+        with self._lock:
+            known = len(self._terms)
+            self._apply((snapshot.to_dict() or {}).get('terms', []) if snapshot.exists else [])
+            self._loaded = True
+            grew = len(self._terms) > known
+        if grew:
+            # Masks cached for legacy profiles may have skipped these terms
+            _mask_for_stack.cache_clear()
+
+    def intern_all(self, terms):
+        """Append terms missing from the shared table
+
+        For the profile write path only: it runs a transaction whenever a
+        term is new.
+        """
+        if not self._loaded:
+            self.load()
+
+        missing = [key for key in dict.fromkeys(normalize_term(t) for t in terms if isinstance(t, str))
+                   if key and key not in self._ids]
+        if missing and len(self._terms) < self.max_terms:
+            transaction = self._db.transaction()
+            stored = _append_terms(transaction, self._ref(), missing, self.max_terms)
+            with self._lock:
+                self._apply(stored)
+            _mask_for_stack.cache_clear()
+
+    def mask(self, terms):
+        """Bitmask with one bit per distinct known term; unknown terms are skipped"""
+        if not self._loaded:
+            self.load()
+        mask = 0
+        for term in terms:
+            term_id = self._ids.get(normalize_term(term)) if isinstance(term, str) else None
+            if term_id is not None:
+                mask |= 1 << term_id
+        return mask
+
+    def terms(self, mask):
+        """Terms whose bits are set in mask, in vocabulary order"""
+        if mask.bit_length() > len(self._terms):
+            self.load()
+        return [term for i, term in enumerate(self._terms) if mask >> i & 1]
+
+@firestore.transactional
+def _append_terms(transaction, ref, terms, max_terms):
+    snapshot = ref.get(transaction=transaction)
+    stored = (snapshot.to_dict() or {}).get('terms', []) if snapshot.exists else []
+    known = {normalize_term(t) for t in stored}
+    new_terms = [t for t in terms if t not in known][:max(0, max_terms - len(stored))]
+    if new_terms:
+        stored = stored + new_terms
+        transaction.set(ref, {'terms': stored})
+    return stored
+
+def mask_to_words(mask):
+    """Encode a bitmask as signed 64-bit words, the widest integer Firestore stores"""
+    words = []
+    while True:
+        word = mask & 0xFFFFFFFFFFFFFFFF
+        words.append(word - (1 << 64) if word >> 63 else word)
+        mask >>= 64
+        if not mask:
+            return words
+
+def words_to_mask(words):
+    mask = 0
+    for i, word in enumerate(words):
+        mask |= (word & 0xFFFFFFFFFFFFFFFF) << (64 * i)
+    return mask
+
+def tech_mask(profile, intern=False):
+    """The profile's tech-stack bitmask, from the stored field or the cache
+
+    Pass intern=True only when writing the profile: its new terms are then
+    added to the vocabulary rather than skipped.
+    """
+    dev_info = profile.get('developerInfo') or {}
+    stack = tuple(t for t in dev_info.get('techStack') or [] if isinstance(t, str))
+    if intern:
+        vocabulary = get_tech_vocabulary()
+        vocabulary.intern_all(stack)
+        return vocabulary.mask(stack)
+
+    stored = (profile.get('features') or {}).get('techMask')
+    if stored is not None:
+        return words_to_mask(stored)
+    return _mask_for_stack(stack)
+
+@lru_cache(maxsize=65536)
+def _mask_for_stack(stack):
+    # Profiles written before features existed share masks by stack
+    # contents; this runs on read paths, so it never interns
+    return get_tech_vocabulary().mask(stack)
+
+_vocabulary = None
+_vocabulary_lock = threading.Lock()
+
+def get_tech_vocabulary():
+    """Return the process-wide vocabulary"""
+    global _vocabulary
+    with _vocabulary_lock:
+        if _vocabulary is None:
+            from app import db
+            _vocabulary = TechVocabulary(db)
+        return _vocabulary
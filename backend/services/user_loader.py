@@ -0,0 +1,79 @@
+import threading
+from flask import g, has_app_context
+
+class UserLoader:
+    """Identity map over users/{id} documents for one request
+
+    Routes ask for every user they are about to render, and all ids not
+    already in the map are read with a single db.get_all call. A document is
+    read at most once per loader unless a later call needs fields the first
+    projection left out.
+    """
+
+    def __init__(self, db, collection='users'):
+        self._db = db
+        self._collection = collection
+        # user_id -> (fields loaded or None for the whole document, data or None)
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _covers(self, entry, fields):
+        loaded, _ = entry
+        return loaded is None or (fields is not None and set(fields) <= loaded)
+
+    def load_many(self, user_ids, fields=None):
+        """{user_id: data or None} for the given ids, fetching misses in one batch
+
+        With `fields`, only those field paths are read; documents that do not
+        exist map to None.
+        """
+        wanted = list(dict.fromkeys(uid for uid in user_ids if uid))
+        with self._lock:
+            missing = [uid for uid in wanted
+                       if uid not in self._entries or not self._covers(self._entries[uid], fields)]
+
+        if missing:
+            # Widen the projection for ids that were loaded with fewer fields
+            field_paths = None
+            if fields is not None:
+                field_paths = set(fields)
+                with self._lock:
+                    for uid in missing:
+                        loaded = self._entries.get(uid, (set(), None))[0]
+                        if loaded is None:
+                            field_paths = None
+                            break
+                        field_paths |= loaded
+                if field_paths is not None:
+                    field_paths = sorted(field_paths)
+
+            refs = [self._db.collection(self._collection).document(uid) for uid in missing]
+            fetched = {uid: None for uid in missing}
+            for snapshot in self._db.get_all(refs, field_paths=field_paths):
+                fetched[snapshot.id] = snapshot.to_dict() if snapshot.exists else None
+
+            loaded = None if field_paths is None else set(field_paths)
+            with self._lock:
+                for uid, data in fetched.items():
+                    self._entries[uid] = (loaded, data)
+
+        with self._lock:
+            return {uid: self._entries[uid][1] for uid in wanted}
+
+    def load(self, user_id, fields=None):
+        """A single user's data, or None if the document does not exist"""
+        return self.load_many([user_id], fields).get(user_id)
+
+    def forget(self, user_id):
+        """Drop a user from the map, e.g. after the request updated them"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+def get_user_loader():
+    """The current request's loader, or a fresh one outside a request"""
+    from app import db
+    if not has_app_context():
+        return UserLoader(db)
+    if 'user_loader' not in g:
+        g.user_loader = UserLoader(db)
+    return g.user_loader
@@ -0,0 +1,10 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.run_matching import install_fake_db
+
+# Services read `from app import db` on first use; point it at memory
+# before any of them is imported
+db = install_fake_db()
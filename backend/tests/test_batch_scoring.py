@@ -0,0 +1,107 @@
+"""score_candidates and rank_candidates against the scalar scorer.
+
+Run from backend/:
+
+    python -m pytest tests
+"""
+import random
+import pytest
+from conftest import db
+from benchmarks.population import generate_population, seed_vocabulary
+from services.batch_scoring import (
+    CandidateColumns, location_search, rank_candidates, score_as_candidate, score_candidates
+)
+from services.geo_service import haversine_km
+from services.matching_service import calculate_match_score
+from services.profile_features import ProfileFeatures
+
+POPULATION_SIZE = 400
+USERS_CHECKED = 40
+
+def _edge_cases(population):
+    """Alter some profiles into the shapes older or partial documents have"""
+    rng = random.Random(7)
+    for i, profile in enumerate(population.values()):
+        case = i % 10
+        if case == 1:
+            del profile['dateOfBirth']
+        elif case == 2:
+            profile['dateOfBirth'] = 'not a date'
+        elif case == 3:
+            profile['developerInfo']['techStack'] = []
+        elif case == 4:
+            profile['location'] = None
+        elif case == 5:
+            # Written before features existed
+            del profile['features']
+        elif case == 6:
+            profile['preferences']['locationRadius'] = None
+        elif case == 7:
+            profile['preferences']['workPreference'] = rng.choice(['remote', 'hybrid', 'office'])
+        if case in (1, 2, 3, 4):
+            profile['features'] = ProfileFeatures.from_profile(profile).to_document()
+
+@pytest.fixture(scope='module')
+def population():
+    seed_vocabulary(db)
+    population = generate_population(POPULATION_SIZE, seed=11)
+    _edge_cases(population)
+    return population
+
+def _pool(population, user_id):
+    gender = population[user_id]['gender']
+    return [(candidate_id, profile) for candidate_id, profile in population.items()
+            if profile['gender'] != gender]
+
+def _within_radius(user_profile, candidate_profile):
+    search = location_search(user_profile)
+    if search is None:
+        return True
+    features = ProfileFeatures.load(candidate_profile)
+    if not features.has_location:
+        return True
+    lat, lng, radius = search
+    return haversine_km(lat, lng, [features.lat], [features.lng])[0] <= radius
+
+def _checked_users(population):
+    return random.Random(3).sample(sorted(population), USERS_CHECKED)
+
+def test_score_candidates_matches_scalar(population):
+    for user_id in _checked_users(population):
+        user_profile = population[user_id]
+        pool = _pool(population, user_id)
+        scores = score_candidates(user_profile, CandidateColumns(pool))
+        expected = [calculate_match_score(user_profile, profile) for _, profile in pool]
+        assert scores.tolist() == expected, user_id
+
+@pytest.mark.parametrize('k', [None, 1, 10, 50])
+@pytest.mark.parametrize('min_score', [0, 40, 70])
+def test_rank_candidates_matches_full_sort(population, k, min_score):
+    for user_id in _checked_users(population):
+        user_profile = population[user_id]
+        pool = _pool(population, user_id)
+        ranked = rank_candidates(user_profile, CandidateColumns(pool), k=k, min_score=min_score)
+
+        scored = [(row, calculate_match_score(user_profile, profile))
+                  for row, (_, profile) in enumerate(pool)
+                  if _within_radius(user_profile, profile)]
+        expected = sorted((pair for pair in scored if pair[1] >= min_score), key=lambda pair: -pair[1])
+        if k is not None:
+            expected = expected[:k]
+        assert ranked == expected, user_id
+
+def test_rank_candidates_excludes_id(population):
+    user_id = _checked_users(population)[0]
+    pool = _pool(population, user_id)
+    excluded = pool[0][0]
+    ranked = rank_candidates(population[user_id], CandidateColumns(pool), min_score=0, exclude_id=excluded)
+    assert 0 not in [row for row, _ in ranked]
+
+def test_score_as_candidate_matches_scalar(population):
+    for candidate_id in _checked_users(population):
+        candidate_profile = population[candidate_id]
+        pool = _pool(population, candidate_id)
+        scores, within_radius = score_as_candidate(candidate_profile, CandidateColumns(pool))
+        expected = [calculate_match_score(profile, candidate_profile) for _, profile in pool]
+        assert scores.tolist() == expected, candidate_id
+        assert within_radius.tolist() == [_within_radius(profile, candidate_profile) for _, profile in pool]
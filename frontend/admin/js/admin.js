@@ -28,12 +28,24 @@ async function loadDashboard() {
     }
 }
 
-// Load users list
-async function loadUsers(filter = 'all', page = 1) {
+// Columns the users table shows
+const USER_TABLE_FIELDS = 'fullName,email,phone,photos,verification,isPremium';
+
+// Cursor for the page after the one on screen, the filter it belongs
+// to, and the cursors of earlier pages for going back
+let usersNextCursor = null;
+let usersFilter = 'all';
+let usersPageCursors = [];
+
+// Load users list (pass a cursor to load the next page)
+async function loadUsers(filter = 'all', cursor = null) {
     try {
         const token = localStorage.getItem('authToken');
+        const params = new URLSearchParams({ filter, limit: 20, fields: USER_TABLE_FIELDS });
+        if (cursor) params.set('cursor', cursor);
+        
         const response = await fetch(
-            `${API_URL}/api/admin/users?filter=${filter}&page=${page}&limit=20`,
+            `${API_URL}/api/admin/users?${params}`,
             { headers: { 'Authorization': `Bearer ${token}` } }
         );
         
@@ -43,7 +55,17 @@ async function loadUsers(filter = 'all', page = 1) {
             throw new Error(data.error);
         }
         
+        // A new filter starts over from the first page
+        if (filter !== usersFilter || !cursor) {
+            usersPageCursors = [];
+        }
+        if (cursor && usersPageCursors[usersPageCursors.length - 1] !== cursor) {
+            usersPageCursors.push(cursor);
+        }
+        usersFilter = filter;
+        usersNextCursor = data.nextCursor;
         renderUsersTable(data.users);
+        renderUsersPager();
         
     } catch (error) {
         console.error('Error loading users:', error);
@@ -82,6 +104,34 @@ function renderUsersTable(users) {
     `).join('');
 }
 
+function renderUsersPager() {
+    const table = document.getElementById('users-tbody')?.closest('table');
+    if (!table) return;
+    
+    let pager = document.getElementById('users-pager');
+    if (!pager) {
+        pager = document.createElement('div');
+        pager.id = 'users-pager';
+        pager.className = 'pager';
+        pager.innerHTML = `
+            <button id="users-prev" class="btn-sm btn-secondary" onclick="loadPreviousUsers()">Previous</button>
+            <button id="users-next" class="btn-sm btn-secondary" onclick="loadNextUsers()">Next</button>
+        `;
+        table.after(pager);
+    }
+    document.getElementById('users-prev').disabled = usersPageCursors.length === 0;
+    document.getElementById('users-next').disabled = !usersNextCursor;
+}
+
+function loadNextUsers() {
+    if (usersNextCursor) loadUsers(usersFilter, usersNextCursor);
+}
+
+function loadPreviousUsers() {
+    usersPageCursors.pop();
+    loadUsers(usersFilter, usersPageCursors[usersPageCursors.length - 1] || null);
+}
+
 // Verify user
 async function verifyUser(userId) {
     if (!confirm('Verify this user profile?')) return;
@@ -206,9 +256,9 @@ async function sendBroadcast() {
         const data = await response.json();
         
         if (data.success) {
-            alert(data.message);
             document.getElementById('broadcast-title').value = '';
             document.getElementById('broadcast-message').value = '';
+            watchBroadcastJob(data.jobId);
         } else {
             alert(data.error);
         }
@@ -218,6 +268,39 @@ async function sendBroadcast() {
     }
 }
 
+// Broadcasts run in the background; poll the job until it finishes
+async function watchBroadcastJob(jobId) {
+    const token = localStorage.getItem('authToken');
+    const status = document.getElementById('broadcast-status');
+    
+    for (;;) {
+        try {
+            const response = await fetch(`${API_URL}/api/admin/broadcast/jobs/${jobId}`, {
+                headers: { 'Authorization': `Bearer ${token}` }
+            });
+            const data = await response.json();
+            if (!data.success) throw new Error(data.error);
+            
+            const job = data.job;
+            const progress = `${job.processed} of ${job.total ?? '?'} users`;
+            if (status) status.textContent = `Broadcast ${job.status}: ${progress}`;
+            
+            if (job.status === 'completed') {
+                alert(`Notification sent to ${job.processed} users`);
+                return;
+            }
+            if (job.status === 'failed') {
+                alert(`Broadcast stopped after ${progress}: ${job.error}`);
+                return;
+            }
+        } catch (error) {
+            console.error('Error checking broadcast:', error);
+            return;
+        }
+        await new Promise(resolve => setTimeout(resolve, 2000));
+    }
+}
+
 // Initialize on load
 document.addEventListener('DOMContentLoaded', () => {
     loadDashboard();
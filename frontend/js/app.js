@@ -63,16 +63,16 @@ async function renderMatchesPage() {
                     ${matches.map(match => `
                         <div class="match-card" data-user-id="${match.userId}">
                             <div class="match-photo">
-                                <img src="${match.profile.photos?.[0]?.url || 'assets/default-avatar.png'}" 
-                                     alt="${match.profile.fullName}">
+                                <img src="${match.photo || 'assets/default-avatar.png'}" 
+                                     alt="${match.fullName}">
                             </div>
                             <div class="match-info">
-                                <h3>${match.profile.fullName}</h3>
+                                <h3>${match.fullName}${match.age ? `, ${match.age}` : ''}</h3>
                                 <p class="match-score">Match Score: ${match.matchScore}%</p>
-                                <p>${match.profile.developerInfo.role}</p>
-                                <p>${match.profile.city}, ${match.profile.state}</p>
+                                <p>${match.role || ''}</p>
+                                <p>${match.city}, ${match.state}</p>
                                 <div class="tech-tags">
-                                    ${match.profile.developerInfo.techStack.slice(0, 3).map(tech => 
+                                    ${match.topTech.map(tech => 
                                         `<span class="tech-tag">${tech}</span>`
                                     ).join('')}
                                 </div>
@@ -121,5 +121,42 @@ async function sendMatchRequest(userId) {
     }
 }
 
+// Full profile, fetched only when a match card is opened
+async function viewProfile(userId) {
+    const content = document.getElementById('main-content');
+    try {
+        const token = localStorage.getItem('authToken');
+        const response = await fetch(`${API_URL}/api/profiles/${userId}`, {
+            headers: { 'Authorization': `Bearer ${token}` }
+        });
+        
+        const profile = await response.json();
+        
+        if (profile.error) {
+            throw new Error(profile.error);
+        }
+        
+        const developerInfo = profile.developerInfo || {};
+        content.innerHTML = `
+            <div class="profile-view">
+                <img src="${profile.photos?.[0]?.url || 'assets/default-avatar.png'}" alt="${profile.fullName}">
+                <h2>${profile.fullName}</h2>
+                <p>${developerInfo.role || ''}${developerInfo.companyName ? ` at ${developerInfo.companyName}` : ''}</p>
+                <p>${profile.city}, ${profile.state}</p>
+                <div class="tech-tags">
+                    ${(developerInfo.techStack || []).map(tech => `<span class="tech-tag">${tech}</span>`).join('')}
+                </div>
+                <div class="match-actions">
+                    <button class="btn-primary" onclick="sendMatchRequest('${userId}')">Connect</button>
+                    <button class="btn-secondary" onclick="loadPage('matches')">Back</button>
+                </div>
+            </div>
+        `;
+    } catch (error) {
+        console.error('Error loading profile:', error);
+        alert('Failed to load profile');
+    }
+}
+
 // Initialize on load
 document.addEventListener('DOMContentLoaded', initApp); 
@@ -1,2 +1,242 @@
- 
- 
\ No newline at end of file
+// Chat: conversation list, message history and a live event stream.
+// New messages, typing and read receipts arrive over /api/chat/stream.
+// The stream only carries events handled by the server worker it is
+// connected to, so the open conversation also polls with ?since= at a low
+// rate, and catches up the same way after every reconnect.
+
+const CHAT_FALLBACK_POLL_MS = 20000;
+
+let activeChat = null;       // { conversationId, otherUserId, since }
+let chatStreamOpen = false;
+let typingSentAt = 0;
+
+// For values interpolated into HTML; names and messages are user input
+function escapeHtml(value) {
+    const div = document.createElement('div');
+    div.textContent = value ?? '';
+    return div.innerHTML.replace(/"/g, '&quot;').replace(/'/g, '&#39;');
+}
+
+async function chatFetch(path, options = {}) {
+    const token = localStorage.getItem('authToken');
+    const response = await fetch(`${API_URL}${path}`, {
+        ...options,
+        headers: {
+            'Authorization': `Bearer ${token}`,
+            'Content-Type': 'application/json',
+            ...(options.headers || {})
+        }
+    });
+    return response.json();
+}
+
+async function renderChatPage() {
+    try {
+        const conversations = await chatFetch('/api/chat/conversations');
+
+        if (conversations.error) {
+            throw new Error(conversations.error);
+        }
+
+        connectChatStream();
+
+        return `
+            <div class="chat-container">
+                <div class="conversation-list">
+                    ${conversations.map(conv => `
+                        <div class="conversation-item" id="conv-${escapeHtml(conv.id)}"
+                             data-conversation-id="${escapeHtml(conv.id)}" data-user-id="${escapeHtml(conv.otherUser?.userId)}"
+                             onclick="openConversation(this.dataset.conversationId, this.dataset.userId)">
+                            <img src="${escapeHtml(conv.otherUser?.photo || 'assets/default-avatar.png')}" alt="${escapeHtml(conv.otherUser?.fullName)}">
+                            <div>
+                                <h4>${escapeHtml(conv.otherUser?.fullName)}</h4>
+                                <p class="last-message">${escapeHtml(conv.lastMessage)}</p>
+                            </div>
+                        </div>
+                    `).join('')}
+                </div>
+                <div class="chat-window" id="chat-window">
+                    <p class="chat-empty">Select a conversation</p>
+                </div>
+            </div>
+        `;
+    } catch (error) {
+        console.error('Error loading conversations:', error);
+        return `<div class="error">Failed to load conversations</div>`;
+    }
+}
+
+async function openConversation(conversationId, otherUserId) {
+    const chatWindow = document.getElementById('chat-window');
+    activeChat = { conversationId, otherUserId, since: null };
+
+    chatWindow.innerHTML = `
+        <div class="chat-header">
+            <span id="chat-presence" class="presence"></span>
+            <span id="chat-typing" class="typing" hidden>typing...</span>
+        </div>
+        <div class="messages" id="chat-messages"></div>
+        <div class="chat-input">
+            <input type="text" id="chat-input" placeholder="Type a message..."
+                   oninput="sendTyping()" onkeydown="if (event.key === 'Enter') sendChatMessage()">
+            <button onclick="sendChatMessage()">Send</button>
+        </div>
+    `;
+
+    await loadMessages();
+    updatePresence();
+}
+
+// Latest page on open, then only what is newer than the last message seen
+async function loadMessages() {
+    if (!activeChat) return;
+    const chat = activeChat;
+    const query = chat.since ? `?since=${encodeURIComponent(chat.since)}` : '';
+
+    try {
+        const data = await chatFetch(`/api/chat/messages/${chat.conversationId}${query}`);
+        if (!data.success || chat !== activeChat) return;
+
+        data.messages.forEach(appendMessage);
+        if (data.since) chat.since = data.since;
+    } catch (error) {
+        console.error('Error loading messages:', error);
+    }
+}
+
+function appendMessage(message) {
+    const container = document.getElementById('chat-messages');
+    if (!container || document.getElementById(`msg-${message.id}`)) return;
+
+    const userId = localStorage.getItem('userId');
+    const div = document.createElement('div');
+    div.id = `msg-${message.id}`;
+    div.className = `message ${message.senderId === userId ? 'sent' : 'received'}`;
+    div.textContent = message.text;
+    container.appendChild(div);
+    container.scrollTop = container.scrollHeight;
+}
+
+async function sendChatMessage() {
+    const input = document.getElementById('chat-input');
+    const text = input.value.trim();
+    if (!text || !activeChat) return;
+
+    input.value = '';
+    const data = await chatFetch('/api/chat/send-message', {
+        method: 'POST',
+        body: JSON.stringify({ receiverId: activeChat.otherUserId, message: text })
+    });
+
+    if (!data.success) {
+        alert(data.error);
+    }
+}
+
+// At most one typing event every few seconds while the user types
+function sendTyping() {
+    if (!activeChat || Date.now() - typingSentAt < 3000) return;
+    typingSentAt = Date.now();
+    chatFetch('/api/chat/typing', {
+        method: 'POST',
+        body: JSON.stringify({ receiverId: activeChat.otherUserId })
+    }).catch(() => {});
+}
+
+async function updatePresence() {
+    if (!activeChat) return;
+    const data = await chatFetch(`/api/chat/presence?userIds=${activeChat.otherUserId}`);
+    const el = document.getElementById('chat-presence');
+    const presence = data.presence?.[activeChat.otherUserId];
+    if (!el || !presence) return;
+
+    el.textContent = presence.online ? 'Online'
+        : presence.lastSeen ? `Last seen ${new Date(presence.lastSeen).toLocaleString()}` : '';
+}
+
+function handleChatEvent(type, data) {
+    switch (type) {
+        case 'message': {
+            const item = document.querySelector(`#conv-${data.conversationId} .last-message`);
+            if (item) item.textContent = data.text;
+
+            if (activeChat && data.conversationId === activeChat.conversationId) {
+                appendMessage(data);
+                document.getElementById('chat-typing')?.setAttribute('hidden', '');
+                if (data.senderId === activeChat.otherUserId) {
+                    chatFetch('/api/chat/read', {
+                        method: 'POST',
+                        body: JSON.stringify({ otherUserId: activeChat.otherUserId })
+                    }).catch(() => {});
+                }
+            }
+            break;
+        }
+        case 'typing': {
+            if (activeChat && data.conversationId === activeChat.conversationId) {
+                const el = document.getElementById('chat-typing');
+                el?.removeAttribute('hidden');
+                clearTimeout(handleChatEvent.typingTimer);
+                handleChatEvent.typingTimer = setTimeout(() => el?.setAttribute('hidden', ''), 5000);
+            }
+            break;
+        }
+        case 'read': {
+            if (activeChat && data.conversationId === activeChat.conversationId
+                    && data.userId === activeChat.otherUserId) {
+                document.querySelectorAll('#chat-messages .message.sent').forEach(el => el.classList.add('read'));
+            }
+            break;
+        }
+    }
+}
+
+// EventSource cannot send the Authorization header, so the stream is read
+// with fetch. The server closes it every few minutes, and when the ID
+// token expires; reconnecting picks up a fresh token and fetches anything
+// missed meanwhile.
+async function connectChatStream() {
+    if (chatStreamOpen) return;
+    chatStreamOpen = true;
+    let retryMs = 3000;
+    setInterval(loadMessages, CHAT_FALLBACK_POLL_MS);
+
+    for (;;) {
+        try {
+            const token = await auth.currentUser?.getIdToken() || localStorage.getItem('authToken');
+            const response = await fetch(`${API_URL}/api/chat/stream`, {
+                headers: { 'Authorization': `Bearer ${token}` }
+            });
+            if (!response.ok) throw new Error(`Stream failed: ${response.status}`);
+
+            loadMessages();
+            updatePresence();
+
+            const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+            let buffer = '';
+            for (;;) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += value;
+
+                let end;
+                while ((end = buffer.indexOf('\n\n')) !== -1) {
+                    const frame = buffer.slice(0, end);
+                    buffer = buffer.slice(end + 2);
+
+                    let type = 'message';
+                    let data = '';
+                    for (const line of frame.split('\n')) {
+                        if (line.startsWith('event: ')) type = line.slice(7);
+                        else if (line.startsWith('data: ')) data += line.slice(6);
+                        else if (line.startsWith('retry: ')) retryMs = parseInt(line.slice(7), 10);
+                    }
+                    if (data) handleChatEvent(type, JSON.parse(data));
+                }
+            }
+        } catch (error) {
+            console.error('Chat stream error:', error);
+        }
+        await new Promise(resolve => setTimeout(resolve, retryMs));
+    }
+}